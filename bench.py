@@ -0,0 +1,76 @@
+# cpu benchmark using the test rom, no ppu/window so it runs anywhere
+# usage: python bench.py [romfile] [--runs N] [--loglevel N] [--blocks [--warm]]
+# loglevel 5 benchmarks the trace fetch, pipe it through tail -1
+# blocks only pay off on code that runs again and again (game loops, 120 headless frames of nestest
+# with --no-idle-skip go from ~3.9s to ~2.5s). the test rom is almost all straight through code, so a
+# cold cache is about 3x slower than fetch. --warm keeps the cache between runs, but the test rom has
+# ~1500 blocks so it also needs --cache-size 2048, otherwise the lru just thrashes:
+#   python bench.py --blocks --warm --cache-size 2048 (about 4 ms against 7 ms for fetch)
+import time
+import argparse
+
+from cpu import *
+from bus import *
+from mapper import *
+from rom import *
+
+parser = argparse.ArgumentParser(description="slopylator cpu benchmark")
+parser.add_argument("romfile", nargs="?", default="testrom")
+parser.add_argument("--runs", type=int, default=20)
+parser.add_argument("--loglevel", type=int, default=0)
+parser.add_argument("--blocks", action="store_true", help="run through the block cache instead of fetch")
+parser.add_argument("--warm", action="store_true", help="keep the block cache between runs, only registers and ram get reset")
+parser.add_argument("--cache-size", type=int, help="max blocks in the cache (default whatever the cpu uses)")
+args = parser.parse_args()
+
+rom = dmrom(args.romfile)
+
+def makeCpu():
+    bus = dmrambus(False)
+    cpu = dm6502(bus, args.loglevel)
+    makeMapper(rom.header.mapper, bus, rom.prg, rom.chr, rom.header.mirroring)
+    cpu.pc = 0xC000 # automated nestest entrypoint
+    if args.cache_size:
+        cpu.blockCacheSize = args.cache_size
+    return cpu, bus
+
+def cpuState(cpu, bus):
+    return (cpu.pc, cpu.a, cpu.x, cpu.y, cpu.sp, cpu.sr, cpu.cycles, bytes(bus.cpumem[0:0x800]))
+
+# dry run to count instructions until the tst opcode
+cpu, bus = makeCpu()
+count = 0
+while bus.memoryReadCPU(cpu.pc) != 0x04:
+    cpu.fetch()
+    count += 1
+endCycles = cpu.cycles
+expected = cpuState(cpu, bus)
+
+best = None
+if args.warm:
+    cpu, bus = makeCpu()
+    cpuStart = cpu.snapshot()
+    ramStart = bytes(bus.cpumem)
+for i in range(args.runs):
+    if args.warm:
+        # same cpu so the cached blocks (bound to it) stay, code is all rom so nothing goes stale
+        cpu.restore(cpuStart)
+        bus.cpumem[:] = ramStart
+    else:
+        cpu, bus = makeCpu()
+    start = time.perf_counter()
+    if args.blocks:
+        while cpu.cycles < endCycles:
+            cpu.runBlock(endCycles)
+    else:
+        for j in range(count):
+            cpu.fetch()
+    elapsed = time.perf_counter() - start
+    if best is None or elapsed < best:
+        best = elapsed
+
+if cpuState(cpu, bus) != expected:
+    print("WARNING: end state differs from the interpreter!")
+if args.blocks:
+    print(f"block cache: {cpu.blockHits} hits, {cpu.blockMisses} misses, {len(cpu.blockCache)} blocks")
+print(f"{count} instructions, best of {args.runs}: {best * 1000:.2f} ms, {count / best:,.0f} instructions/s")
@@ -1,26 +1,165 @@
+import struct
+
+# save state layout: magic, version, nametable map, pending nmi, then the memory blocks below
+busState = struct.Struct("<4sBBBBBB")
+# (buffer name, start, end) saved after the header, rom and mirrors are left out
+busStateMemory = [
+    ("cpumem", 0x0000, 0x0800), # ram
+    ("cpumem", 0x6000, 0x8000), # prg ram
+    ("ppumem", 0x0000, 0x2000), # chr ram (unused with chr rom but cheap)
+    ("ppumem", 0x3F00, 0x3F20), # palette ram
+    ("ppuNameTableMemory", 0x0000, 0x1000)
+]
+
 class dmrambus:
     def __init__(self, isVertical):
         # up to 0x10000 for both cpu and ppu
-        self.cpumem = [0] * 0x10000
-        self.ppumem = [0] * 0x4000
+        # bytearrays so big copies (dma, rom loading, save states) are just slices
+        self.cpumem = bytearray(0x10000)
+        self.ppumem = bytearray(0x4000)
 
-        self.ppuNameTableMemory = [0] * 0xffff
+        self.ppuNameTableMemory = bytearray(0x1000) # 2 physical nametables (4 for four screen carts), the rest is mirrors
+        self.ntMap = [0, 0, 1, 1] # physical nametable behind each of the 4 logical ones, see setMirroring
+        self.chrDirty = bytearray(b"\x01" * 512) # per 16 byte tile, set on writes below 0x2000, the ppu clears it
         
-        # bus rw log, can be reset by PPU/CPU i guess
-        self.cpuLastRead = 0xFFFFF
-        self.cpuLastWrite = 0xFFFFF
+        # pattern tables as 8 1kb views, mappers swap chr banks by pointing these somewhere else
+        # starts out as chr ram in ppumem
+        self.chrPages = [memoryview(self.ppumem)[i * 0x400:(i + 1) * 0x400] for i in range(8)]
         
         # internal PPU flip flops
         self.ppuintlAddrHigh = True
-        self.isVertical = False
         self.ppuInterrupt = False
         
         self.isVertical = isVertical
-
-        self.readHooks = []
-        self.writeHooks = []
+        
+        # addresses the cpu has cached code from, writes there call codeWriteHook
+        self.codeMap = bytearray(0x10000)
+        self.codeWriteHook = None
+        self.bankSwitchHook = None # bankSwitchHook(start, end) when a mapper swaps prg under those addresses
+        self.dmaStall = None # called when oam dma runs, the cpu adds the cycles it loses
+        
+        # cpu page table, one entry per 256 byte page
+        # memory pages point straight at a memoryview of the backing buffer (mirrors included)
+        # device pages are None there and use a 256 entry handler list instead (see mapDevice)
+        self.readPages = [None] * 0x100
+        self.writePages = [None] * 0x100
+        self.codePages = [None] * 0x100 # codeMap views, same mirroring as memory
+        self.deviceReads = [None] * 0x100
+        self.deviceWrites = [None] * 0x100
+        for page in range(0x100):
+            if page < 0x20:
+                base = (page & 0x7) << 8 # 0x800-0x1FFF mirrors ram
+            else:
+                base = page << 8
+            self.mapMemory(page, self.cpumem, base)
+        for page in range(0x20, 0x40):
+            self.__makeDeviceReads(page) # ppu registers and their mirrors
+            self.__makeDeviceWrites(page)
+    
+    # point a cpu page at 256 bytes of buffer starting at offset
+    def mapMemory(self, page, buffer, offset, writable = True):
+        view = memoryview(buffer)[offset:offset + 0x100]
+        self.readPages[page] = view
+        self.writePages[page] = view if writable else None
+        self.codePages[page] = memoryview(self.codeMap)[offset:offset + 0x100]
+        self.deviceReads[page] = None
+        self.deviceWrites[page] = None
+    
+    # point the cpu pages starting at address at prg rom, one 256 byte view per page
+    # only reads change, writes there keep going to whoever claimed them (the mapper registers)
+    def mapPrg(self, address, views):
+        changed = False
+        for i, view in enumerate(views):
+            page = (address >> 8) + i
+            if self.readPages[page] is not view:
+                self.readPages[page] = view
+                self.deviceReads[page] = None
+                changed = True
+        if changed and self.bankSwitchHook is not None:
+            self.bankSwitchHook(address, address + len(views) * 0x100 - 1)
+    
+    # same for the pattern tables, 1kb views, only the tiles of pages that really changed get decoded again
+    def mapChr(self, address, views):
+        for i, view in enumerate(views):
+            page = (address >> 10) + i
+            if self.chrPages[page] is not view:
+                self.chrPages[page] = view
+                self.chrDirty[page * 64:(page + 1) * 64] = b"\x01" * 64
+    
+    # save states, all the ram the bus owns
+    def snapshot(self):
+        data = bytearray(busState.pack(b"dmBS", 1, *self.ntMap, self.ppuInterrupt))
+        for name, start, end in busStateMemory:
+            data += getattr(self, name)[start:end]
+        return bytes(data)
+    
+    def restore(self, data):
+        magic, version, nt0, nt1, nt2, nt3, ppuInterrupt = busState.unpack_from(data)
+        if magic != b"dmBS" or version != 1:
+            raise Exception("Save state is not a bus state from this version")
+        self.ntMap = [nt0, nt1, nt2, nt3]
+        self.ppuInterrupt = bool(ppuInterrupt)
+        
+        offset = busState.size
+        for name, start, end in busStateMemory:
+            getattr(self, name)[start:end] = data[offset:offset + end - start]
+            offset += end - start
+        
+        # code and chr ram changed behind everyones back
+        self.chrDirty[:] = b"\x01" * 512
+        if self.bankSwitchHook is not None:
+            self.bankSwitchHook(0x0000, 0xFFFF)
+    
+    # which physical nametable each logical one ($2000, $2400, $2800, $2C00) uses
+    def setMirroring(self, mode):
+        self.ntMap = {
+            "horizontal": [0, 0, 1, 1],
+            "vertical": [0, 1, 0, 1],
+            "single0": [0, 0, 0, 0],
+            "single1": [1, 1, 1, 1],
+            "four": [0, 1, 2, 3] # extra 2kb on the cart
+        }[mode]
+    
+    # old flag from before mappers, only knows the two header mirroring modes
+    @property
+    def isVertical(self):
+        return self.ntMap == [0, 1, 0, 1]
+    
+    @isVertical.setter
+    def isVertical(self, value):
+        self.setMirroring("vertical" if value else "horizontal")
+    
+    # anything on the page that no device claims acts like plain memory
+    def __makeDeviceReads(self, page):
+        if self.deviceReads[page] is None:
+            base = page << 8
+            self.deviceReads[page] = [lambda a=base + i: self.cpumem[a] for i in range(0x100)]
+            self.readPages[page] = None
+    
+    def __makeDeviceWrites(self, page):
+        if self.deviceWrites[page] is None:
+            base = page << 8
+            self.deviceWrites[page] = [lambda value, a=base + i: self.__writeFallback(a, value) for i in range(0x100)]
+            self.writePages[page] = None
+    
+    # devices claim address ranges with per-register handler tables instead of hooking every access
+    # the tables repeat over the range, so an 8 entry table on 0x2000-0x3FFF covers the mirrors too
+    # read() -> value, write(value), None leaves that direction as memory
+    def mapDevice(self, start, end, reads, writes):
+        for address in range(start, end + 1):
+            page = address >> 8
+            if reads is not None:
+                self.__makeDeviceReads(page)
+                self.deviceReads[page][address & 0xFF] = reads[(address - start) % len(reads)]
+            if writes is not None:
+                self.__makeDeviceWrites(page)
+                self.deviceWrites[page][address & 0xFF] = writes[(address - start) % len(writes)]
+    
+    def __writeFallback(self, address, value):
+        self.cpumem[address] = value
         
     # address mirroring logic for CPU
+    # the page table already has this baked in, only devices and old callers need it
     def getMemAddyCPU(self, address):
         address &= 0xFFFF
         
@@ -38,67 +177,61 @@ class dmrambus:
         return address
     
     def memoryReadCPU(self, address, end = None):
-        fixAddy = self.getMemAddyCPU(address)
-        self.cpuLastRead = fixAddy
-
-        for f in self.readHooks:
-            v = f(fixAddy)
-            if v is not None:
-                return v
-        
-        # handle weird PPU edge cases (prepare for yandev quality code)
-        # if fixAddy == 0x2002:
-        #     self.ppuintlAddrHigh = False
-        # elif fixAddy == 0x2006:
-        #     # for double address reads
-        #     self.ppuintlAddrHigh = (not self.ppuintlAddrHigh)
-        
         if end != None:
             retVal = []
             for i in range(address, end):
-                fixAddy = self.getMemAddyCPU(i)
-                retVal.append(self.cpumem[fixAddy])
-        else:
-            return self.cpumem[fixAddy]
-        return retVal
+                retVal.append(self.memoryPeekCPU(i))
+            return retVal
+        
+        address &= 0xFFFF
+        mem = self.readPages[address >> 8]
+        if mem is not None:
+            return mem[address & 0xFF]
+        return self.deviceReads[address >> 8][address & 0xFF]()
+    
+    # operand bytes of an instruction, code never runs from the io registers
+    # so this never calls a device (same as the old list read did after the first byte)
+    def memoryPeekCPU(self, address):
+        address &= 0xFFFF
+        mem = self.readPages[address >> 8]
+        if mem is not None:
+            return mem[address & 0xFF]
+        return self.cpumem[self.getMemAddyCPU(address)]
     
     def memoryWriteCPU(self, address, value):
-        fixAddy = self.getMemAddyCPU(address)
-        self.cpuLastWrite = fixAddy
-        
-        for f in self.writeHooks:
-            if f(fixAddy, value) is not None:
-                return
-
-        self.cpumem[fixAddy] = value
+        address &= 0xFFFF
+        mem = self.writePages[address >> 8]
+        if mem is None:
+            self.deviceWrites[address >> 8][address & 0xFF](value & 0xFF)
+            return
         
-        # handle weird PPU edge cases (prepare for yandev quality code)
-        # if fixAddy == 0x2006:
-        #     # for double address writes
-        #     self.ppuintlAddrHigh = (not self.ppuintlAddrHigh)
+        mem[address & 0xFF] = value & 0xFF
+        if self.codePages[address >> 8][address & 0xFF]:
+            self.codeWriteHook(self.getMemAddyCPU(address))
         
     # address mirroring logic for PPU
     def getMemAddyPPU(self, address):
         address &= 0x3FFF
         if address >= 0 and address <= 0x1FFF:
-            return self.ppumem, address
+            return self.chrPages[address >> 10], address & 0x3FF
                 
         # $3000-3EFF is usually a mirror of the 2kB region from $2000-2EFF. The PPU does not render from this address range, so this space has negligible utility.
         #if (address >= 0x3000) and (address <= 0x3EFF):
         #    address -= 0x1000
         
-        # horizontal and vertical mirroring
+        # nametable mirroring
         # given A is 0-3ff and B is 400-7ff
         # these need to be mirrored to 2000-3000
-        # hori is AABB and vert is ABAB
+        # hori is AABB and vert is ABAB, mappers can pick others (see setMirroring)
         if (address >= 0x2000) and (address <= 0x2FFF):
-            if self.isVertical:
-                return self.ppuNameTableMemory, address & 0x7FF
-            else:
-                offset = address & 0x3FF
-                quartile = (address - 0x2000) // 0x400
-                newAddress = offset + ((quartile // 2) * 0x400)
-                return self.ppuNameTableMemory, newAddress
+            return self.ppuNameTableMemory, (self.ntMap[(address >> 10) & 3] << 10) | (address & 0x3FF)
+        
+        # palette ram is 32 bytes mirrored up to 0x3FFF
+        # and the sprite backdrop entries (0x3F10/14/18/1C) are the background ones
+        if address >= 0x3F00:
+            address &= 0x3F1F
+            if (address & 0x13) == 0x10:
+                address &= 0x3F0F
         return self.ppumem, address
         
     def memoryReadPPU(self, address, end = None):
@@ -115,4 +248,8 @@ class dmrambus:
     def memoryWritePPU(self, address, value):
         data, addr = self.getMemAddyPPU(address)
         # print(hex(addr))
-        data[addr] = value
+        if (address & 0x3FFF) < 0x2000:
+            if data.readonly:
+                return # chr rom
+            self.chrDirty[(address & 0x1FFF) >> 4] = 1 # chr ram, tile needs decoding again
+        data[addr] = value & 0xFF
@@ -1,4 +1,10 @@
 import sys
+import struct
+from collections import OrderedDict
+
+# save state layout: magic, version, a, x, y, sp, sr, pc, cycles
+cpuState = struct.Struct("<4sBBBBBBHQ")
+
 class dm6502:
     def __init__(self, rambus, loglevel = 3):
         self.loglevel = loglevel
@@ -12,6 +18,12 @@ class dm6502:
         # special registers
         self.pc = 0x0000 # program counter
         self.sp = 0xFD # stack pointer
+        # N V Z C live in their own fields (see the sr property), the rest stays packed
+        self.flagN = 0
+        self.flagV = 0
+        self.flagZ = 0
+        self.flagC = 0
+        self.srOther = 0 # x B D I bits
         self.sr = 0b00100100 # status register
         self.__srFlags = {
             'n': 7,
@@ -224,6 +236,46 @@ class dm6502:
             0x04: [self.__tst,   1, 1, 0]
         }
         
+        # flat 256 slot tables built from the list above so dispatch is just an index
+        # anything not in the master list goes to the illegal trap
+        self.__handlers = [self.__illegal] * 0x100
+        self.__lengths = [1] * 0x100
+        self.__baseCycles = [0] * 0x100
+        self.__pageCross = [0] * 0x100 # stars, 1 = +1 on page cross, 2 = branch
+        self.__mnemonics = ["???"] * 0x100 # only used by the trace fetch
+        for opcode, (func, size, cycles, stars) in self.__opcodes.items():
+            self.__handlers[opcode] = func
+            self.__mnemonics[opcode] = func.__name__.split("__")[-1][0:3]
+            self.__lengths[opcode] = size
+            self.__baseCycles[opcode] = cycles
+            self.__pageCross[opcode] = stars
+        
+        # basic block cache (see runBlock)
+        # a block ends at anything that touches pc, or at the illegal trap
+        self.__blockEnd = [True] * 0x100
+        for opcode in self.__opcodes:
+            self.__blockEnd[opcode] = (self.__pageCross[opcode] == 2) or (opcode in [0x00, 0x04, 0x20, 0x40, 0x4C, 0x60, 0x6C])
+        self.blockCache = OrderedDict() # pc: (body, last instruction), oldest first
+        self.blockCacheSize = 1024 # max blocks before LRU eviction
+        self.blockMaxLength = 32 # max instructions per block
+        self.blockHits = 0
+        self.blockMisses = 0
+        self.blockLimit = 0 # runBlock stops once cycles reach this
+        self.__blockAddrs = {} # pc: set of (mirrored) addresses the block was decoded from
+        self.__blockPages = {} # page: set of block pcs on that page
+        self.rambus.codeWriteHook = self.invalidateBlocks
+        self.rambus.bankSwitchHook = self.invalidateRange
+        self.rambus.dmaStall = self.oamDmaStall
+        
+        # idle loop analysis (see idleLoop), pc: (cycles per iteration or 0, address of the jump back)
+        self.idleLoops = {}
+        # opcodes that only read, and where running them twice gives the same state as once
+        # lda ldx ldy and ora cmp cpx cpy (imm/zp/abs), bit, nop
+        self.__idleSafe = [0xA9, 0xA5, 0xAD, 0xA2, 0xA6, 0xAE, 0xA0, 0xA4, 0xAC,
+                           0x29, 0x25, 0x2D, 0x09, 0x05, 0x0D,
+                           0xC9, 0xC5, 0xCD, 0xE0, 0xE4, 0xEC, 0xC0, 0xC4, 0xCC,
+                           0x24, 0x2C, 0xEA]
+        
         self.log("6502 CPU initialized", 3)
         pass
     
@@ -238,39 +290,241 @@ class dm6502:
         if (self.loglevel >= level):
             print("[cpu]",self.loglevels[level], *va_list)
     
-    def fetch(self, pc = None):
+    # setting the loglevel picks which fetch gets used, trace (5) is its own instrumented
+    # fetch so the normal one never formats strings or does extra bus reads
+    @property
+    def loglevel(self):
+        return self.__loglevel
+    
+    @loglevel.setter
+    def loglevel(self, level):
+        self.__loglevel = level
+        if level >= 5:
+            self.fetch = self.__fetchTrace
+        else:
+            self.fetch = self.__fetch
+    
+    def __fetchTrace(self, pc = None):
+        if pc == None:
+            pc = self.pc
+        opcode = self.rambus.memoryReadCPU(pc)
+        operand = self.rambus.memoryPeekCPU(pc+1) | (self.rambus.memoryPeekCPU(pc+2) << 8)
+        operand &= (1 << ((self.__lengths[opcode] - 1) * 8)) - 1 # only the bytes that belong to it
+        self.log(f"pc = {hex(pc)} ins = {hex(opcode)} {self.__mnemonics[opcode]} {hex(operand)}", 5)
+        self.__fetch(pc)
+        self.log(f"A {hex(self.a)} X {hex(self.x)} Y {hex(self.y)} SR {hex(self.sr)} SP {hex(self.sp)}", 5)
+    
+    def __fetch(self, pc = None):
         if pc == None:
             pc = self.pc # cannot access self as default val i hate you python
-            self.log(f"pc = {hex(self.pc)} ins = {hex(self.rambus.memoryReadCPU(self.pc))}", 5)
         
         opcode = self.rambus.memoryReadCPU(pc)
-        params = []
-        # determine params array for opcode
-        if (opcode in self.__opcodes):
-            paramLen = self.__opcodes[opcode][1]
-            # params = self.memory[(pc+1):(pc+paramLen)]
-            params = self.rambus.memoryReadCPU(pc+1, pc+paramLen) # start from after the instruction and parse remaining instructions (paramLen is already added by 1 by default)
-        
-        self.decodeExecute(opcode, params)
-        
+        paramLen = self.__lengths[opcode]
+        # read operand bytes straight into one int, no list per instruction
+        if paramLen == 1:
+            operand = 0
+        elif paramLen == 2:
+            operand = self.rambus.memoryPeekCPU(pc+1)
+        else:
+            peek = self.rambus.memoryPeekCPU
+            operand = peek(pc+1) | (peek(pc+2) << 8)
+        
+        # hot path, no dict lookups here
+        self.__handlers[opcode](operand)
+        self.pc += paramLen
+        self.cycles += self.__baseCycles[opcode]
+        # TODO: cycle handling (page cross penalties are in self.__pageCross)
+    
+    # runs a whole cached block of straight line code starting at pc
+    # stops early once cycles reach limit so ppu events still land on the same instruction
+    def runBlock(self, limit):
+        pc = self.pc
+        block = self.blockCache.get(pc)
+        if block is None:
+            self.blockMisses += 1
+            block = self.__decodeBlock(pc)
+        else:
+            self.blockHits += 1
+            self.blockCache.move_to_end(pc)
+        
+        # only the last instruction of a block looks at pc, so the body just sets it when it stops
+        body, last = block
+        self.blockLimit = limit
+        for handler, operand, cycles, nextPc in body:
+            handler(operand)
+            self.cycles += cycles
+            if self.cycles >= self.blockLimit:
+                self.pc = nextPc
+                return
+        handler, operand, size, cycles, lastPc = last
+        self.pc = lastPc
+        handler(operand)
+        self.pc += size
+        self.cycles += cycles
+    
+    def __decodeBlock(self, pc):
+        peek = self.rambus.memoryPeekCPU
+        body = []
+        addrs = set()
+        address = pc
+        while True:
+            opcode = peek(address)
+            size = self.__lengths[opcode]
+            if size == 1:
+                operand = 0
+            elif size == 2:
+                operand = peek(address+1)
+            else:
+                operand = peek(address+1) | (peek(address+2) << 8)
+            for i in range(size):
+                addrs.add(self.rambus.getMemAddyCPU(address + i))
+            if self.__blockEnd[opcode] or len(body) + 1 >= self.blockMaxLength:
+                last = (self.__handlers[opcode], operand, size, self.__baseCycles[opcode], address)
+                break
+            address += size
+            body.append((self.__handlers[opcode], operand, self.__baseCycles[opcode], address))
+        block = (tuple(body), last)
+        
+        # make room, least recently used goes first
+        while len(self.blockCache) >= self.blockCacheSize:
+            self.__dropBlock(next(iter(self.blockCache)))
+        
+        self.blockCache[pc] = block
+        self.__blockAddrs[pc] = addrs
+        for addr in addrs:
+            self.rambus.codeMap[addr] = 1
+            self.__blockPages.setdefault(addr >> 8, set()).add(pc)
+        return block
+    
+    # address of the last instruction of the cached block at pc, None if there is no block
+    def blockEnd(self, pc):
+        block = self.blockCache.get(pc)
+        if block is None:
+            return None
+        return block[1][4]
+    
+    def __dropBlock(self, pc):
+        del self.blockCache[pc]
+        for addr in self.__blockAddrs.pop(pc):
+            pages = self.__blockPages.get(addr >> 8)
+            if pages is not None:
+                pages.discard(pc)
+        # codeMap entries are left set, the next write there just finds nothing and clears it
+    
+    # called by the bus when something writes over cached code
+    def invalidateBlocks(self, address):
+        for pc in list(self.__blockPages.get(address >> 8, ())):
+            if address in self.__blockAddrs[pc]:
+                self.__dropBlock(pc)
+                self.blockLimit = 0 # the running block might be the one that changed
+        self.rambus.codeMap[address] = 0
+    
+    # save states, registers and cycle count (ram belongs to the bus)
+    def snapshot(self):
+        return cpuState.pack(b"dmCP", 1, self.a, self.x, self.y, self.sp, self.sr, self.pc, self.cycles)
+    
+    def restore(self, data):
+        magic, version, self.a, self.x, self.y, self.sp, sr, self.pc, self.cycles = cpuState.unpack(data)
+        if magic != b"dmCP" or version != 1:
+            raise Exception("Save state is not a cpu state from this version")
+        self.sr = sr
+        self.blockLimit = 0 # dont finish a block from before the restore
+    
+    # oam dma halts the cpu for 513 cycles, one more if it starts on an odd cycle
+    def oamDmaStall(self):
+        self.cycles += 513 + (self.cycles & 1)
+    
+    # called by the bus when a mapper swaps the rom under start-end
+    def invalidateRange(self, start, end):
+        for page in range(start >> 8, (end >> 8) + 1):
+            for pc in list(self.__blockPages.get(page, ())):
+                if pc in self.blockCache: # might be gone already if it spanned 2 pages
+                    self.__dropBlock(pc)
+        for pc in list(self.idleLoops):
+            if start - 0x20 < pc <= end: # loops are short, one starting just before can run into the range
+                del self.idleLoops[pc]
+        self.blockLimit = 0 # the running block might be the one that changed
     
     def decodeExecute(self, opcode, params):
-        # execute the opcode
-        if (opcode in self.__opcodes) and (len(params) == self.__opcodes[opcode][1] - 1): # params len is subtracted by 1
-            self.__opcodes[opcode][0](params)
-            self.pc += self.__opcodes[opcode][1]
-            self.cycles += self.__opcodes[opcode][2]
-            # TODO: cycle handling
+        # execute the opcode, params is the old style list of operand bytes
+        if len(params) == self.__lengths[opcode] - 1: # params len is subtracted by 1
+            operand = 0
+            for i in range(len(params)):
+                operand |= params[i] << (i * 8)
+            self.__handlers[opcode](operand)
+            self.pc += self.__lengths[opcode]
+            self.cycles += self.__baseCycles[opcode]
         else:
             self.log(f"Illegal instruction! {hex(opcode)} params: {len(params)}", 2)
             raise Exception("Illegal")
     
+    # trap for every opcode not in the master list
+    def __illegal(self, operand):
+        opcode = self.rambus.memoryReadCPU(self.pc)
+        self.log(f"Illegal instruction! {hex(opcode)} operand: {hex(operand)}", 2)
+        raise Exception("Illegal")
+    
+    # checks if the code at pc is a spin loop, straight line reads ending in a jump/branch back to pc
+    # returns (cycles per iteration, address of that jump/branch) if skipping whole iterations
+    # can't change anything, else (0, None)
+    # only reads of ram, $2002 or rom are allowed so only an nmi (or vblank) can break it
+    def idleLoop(self, pc):
+        if pc in self.idleLoops:
+            return self.idleLoops[pc]
+        
+        result = (0, None)
+        cycles = 0
+        address = pc
+        if pc >= 0x8000: # loops running from ram could get rewritten
+            for i in range(8):
+                opcode = self.rambus.memoryPeekCPU(address)
+                size = self.__lengths[opcode]
+                operand = self.rambus.memoryPeekCPU(address+1) | (self.rambus.memoryPeekCPU(address+2) << 8)
+                cycles += self.__baseCycles[opcode]
+                
+                # end of the loop, has to go straight back to pc
+                if self.__pageCross[opcode] == 2:
+                    if (address + 2 + self.toSign8(operand & 0xFF)) & 0xFFFF == pc:
+                        result = (cycles, address)
+                    break
+                if opcode == 0x4C:
+                    if operand == pc:
+                        result = (cycles, address)
+                    break
+                
+                if opcode not in self.__idleSafe:
+                    break
+                if size == 3:
+                    target = self.rambus.getMemAddyCPU(operand)
+                    if not (target < 0x2000 or target == 0x2002 or target >= 0x6000):
+                        break
+                address += size
+        
+        self.idleLoops[pc] = result
+        return result
+    
     def toSign8(self, val):
         sign = (val >> 7) & 1
         if sign == 0:
             return val & 0xFF
         return (((~val) & 0b01111111) + 1) * -1
         
+    # sr is only packed when something actually needs the byte (php, brk, interrupts, test log)
+    @property
+    def sr(self):
+        # 7 6 5 4 3 2 1 0
+        # N V x B D I Z C
+        return (self.flagN << 7) | (self.flagV << 6) | self.srOther | (self.flagZ << 1) | self.flagC
+    
+    @sr.setter
+    def sr(self, value):
+        self.flagN = (value >> 7) & 1
+        self.flagV = (value >> 6) & 1
+        self.flagZ = (value >> 1) & 1
+        self.flagC = value & 1
+        self.srOther = value & 0b00111100
+    
+    # old string flag api, handlers use the flag fields directly now
     def srFlagSet(self, flag, enable):
         # TODO: suggestion from friend to use enums instead
         # 7 6 5 4 3 2 1 0
@@ -308,31 +562,32 @@ class dm6502:
         # return retVal
     
     # addressing boilerplate
-    # immediate - no need because it's in the params
+    # the operand is already one int (lobyte | hibyte << 8) built by fetch
+    # immediate - no need because it's the operand
     # accumulator - no need because it's a register
-    # relative - no need because it's in the params
+    # relative - no need because it's the operand
     # zeropage
-    def getZeroPageAddress(self, param):
-        return param[0] & 0xFF # kinda redundant but guess i'll include it here
+    def getZeroPageAddress(self, operand):
+        return operand & 0xFF # kinda redundant but guess i'll include it here
     # zeropage x
-    def getZeroPageXAddress(self, param):
-        return (param[0] + self.x) & 0xFF
+    def getZeroPageXAddress(self, operand):
+        return (operand + self.x) & 0xFF
     # zeropage y
-    def getZeroPageYAddress(self, param):
-        return (param[0] + self.y) & 0xFF
+    def getZeroPageYAddress(self, operand):
+        return (operand + self.y) & 0xFF
     # absolute
-    def getAbsoluteAddress(self, param):
-        return ((param[1] << 8) | param[0]) & 0xFFFF
+    def getAbsoluteAddress(self, operand):
+        return operand & 0xFFFF
     # absolute x
-    def getAbsoluteXAddress(self, param):
-        return (((param[1] << 8) | param[0]) + self.x) & 0xFFFF # no idea if i should & that or not
+    def getAbsoluteXAddress(self, operand):
+        return (operand + self.x) & 0xFFFF # no idea if i should & that or not
     # absolute y
-    def getAbsoluteYAddress(self, param):
-        return (((param[1] << 8) | param[0]) + self.y) & 0xFFFF # no idea if i should & that or not
+    def getAbsoluteYAddress(self, operand):
+        return (operand + self.y) & 0xFFFF # no idea if i should & that or not
     # indirect
-    def getIndirectAddress(self, param):
-        lobyte = param[0] & 0xFF # bb
-        hibyte = param[1] & 0xFF # cc
+    def getIndirectAddress(self, operand):
+        lobyte = operand & 0xFF # bb
+        hibyte = (operand >> 8) & 0xFF # cc
         
         # AN INDIRECT JUMP MUST NEVER USE A VECTOR BEGINNING ON THE LAST BYTE OF A PAGE (6502 jmpbug)
         address = (hibyte << 8) | lobyte # ccbb
@@ -347,122 +602,120 @@ class dm6502:
         address2 = (hibyte2 << 8) | lobyte2 # yyxx
         return address2 # set pc to this address for jmp
     # indirect x
-    def getIndirectXAddress(self, param):
+    def getIndirectXAddress(self, operand):
         # val = PEEK(PEEK((arg + X) % 256) + PEEK((arg + X + 1) % 256) * 256)
-        return (self.rambus.memoryReadCPU((param[0] + self.x) & 0xFF) + self.rambus.memoryReadCPU((param[0] + self.x + 1) & 0xFF) * 0x100) & 0xFFFF
+        return (self.rambus.memoryReadCPU((operand + self.x) & 0xFF) + self.rambus.memoryReadCPU((operand + self.x + 1) & 0xFF) * 0x100) & 0xFFFF
     # indirect y
-    def getIndirectYAddress(self, param):
+    def getIndirectYAddress(self, operand):
         # val = PEEK(PEEK(arg) + PEEK((arg + 1) % 256) * 256 + Y)
-        return (self.rambus.memoryReadCPU(param[0]) + self.rambus.memoryReadCPU((param[0] + 1) & 0xFF) * 0x100 + self.y) & 0xFFFF
+        return (self.rambus.memoryReadCPU(operand) + self.rambus.memoryReadCPU((operand + 1) & 0xFF) * 0x100 + self.y) & 0xFFFF
     
     # ADC: Add Memory to Accumulator with Carry
     def __adc(self, amount):
-        self.log(f"adc {amount}", 5)
         orig_a = self.a
-        # self.a += amount + int(self.srFlagGet('c'))
-        result = self.a + amount + int(self.srFlagGet('c'))
+        # self.a += amount + self.flagC
+        result = self.a + amount + self.flagC
     
         # set c flag and correct value
-        self.srFlagSet('c', result > 255)
+        self.flagC = result > 255
         self.a = result & 0xFF
     
         # set z flag
-        self.srFlagSet('z', self.a == 0)
+        self.flagZ = self.a == 0
         
         # set n flag
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagN = (self.a >> 7) & 1
     
         # set v flag
         v = ((orig_a ^ self.a) & (amount ^ self.a) & 0x80) != 0
-        self.srFlagSet('v', v)
+        self.flagV = v
     
     # immediate addressing
-    def __adc69(self, params):
-        self.__adc(params[0])
+    def __adc69(self, operand):
+        self.__adc(operand)
     
     # zeropage
-    def __adc65(self, params):
-        address = self.getZeroPageAddress(params)
+    def __adc65(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
     
     # zeropage x
-    def __adc75(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __adc75(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __adc6D(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __adc6D(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
         
     # absolute x
-    def __adc7D(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __adc7D(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
 
     # absolute y
-    def __adc79(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __adc79(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
     
     # indirect x
-    def __adc61(self, params):
+    def __adc61(self, operand):
         # val = PEEK(PEEK((arg + X) % 256) + PEEK((arg + X + 1) % 256) * 256)
-        address = self.getIndirectXAddress(params)
+        address = self.getIndirectXAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
 
     # indirect y
-    def __adc71(self, params):
+    def __adc71(self, operand):
         # val = PEEK(PEEK(arg) + PEEK((arg + 1) % 256) * 256 + Y)
-        address = self.getIndirectYAddress(params)
+        address = self.getIndirectYAddress(operand)
         self.__adc(self.rambus.memoryReadCPU(address))
     
     # AND: AND Memory with Accumulator
     def __and(self, value):
-        self.log(f"and {value}", 5)
         self.a = self.a & value
         
         # set n and z flag
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
-        self.srFlagSet('z', self.a == 0)
+        self.flagN = (self.a >> 7) & 1
+        self.flagZ = self.a == 0
     
     # immediate
-    def __and29(self, params):
-        self.__and(params[0])
+    def __and29(self, operand):
+        self.__and(operand)
     
     # zeropage
-    def __and25(self, params):
-        address = self.getZeroPageAddress(params)
+    def __and25(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
 
     # zeropage x
-    def __and35(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __and35(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __and2D(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __and2D(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
     
     # absolute x
-    def __and3D(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __and3D(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
 
     # absolute y
-    def __and39(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __and39(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
     
     # indirect x
-    def __and21(self, params):
-        address = self.getIndirectXAddress(params)
+    def __and21(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
     
     # indirect y
-    def __and31(self, params):
-        address = self.getIndirectYAddress(params)
+    def __and31(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__and(self.rambus.memoryReadCPU(address))
     
     # ASL: Shift Left One Bit (Memory or Accumulator)
@@ -471,105 +724,96 @@ class dm6502:
         # self.memory[address] = self.memory[address] << 1
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) << 1) & 0xFF) # can overflow
         # set status flags
-        self.srFlagSet('c', bool((old >> 7) & 1))
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
+        self.flagC = (old >> 7) & 1
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
         pass
     
     # accumulator
-    def __asl0A(self, params):
+    def __asl0A(self, operand):
         old = self.a
         self.a = self.a << 1
         self.a &= 0xFF
         # set status flags
-        self.srFlagSet('c', bool((old >> 7) & 1))
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
-        self.srFlagSet('z', self.a == 0)
+        self.flagC = (old >> 7) & 1
+        self.flagN = (self.a >> 7) & 1
+        self.flagZ = self.a == 0
         
     # zeropage
-    def __asl06(self, params):
-        address = self.getZeroPageAddress(params)
+    def __asl06(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__asl(address)
     
     # zeropage x
-    def __asl16(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __asl16(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__asl(address)
 
     # absolute
-    def __asl0E(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __asl0E(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__asl(address)
     
     # absolute x
-    def __asl1E(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __asl1E(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__asl(address)
     
     # branch wrapper
     def __branch(self, size):
         self.pc += self.toSign8(size)
         self.pc &= 0xFFFF
-        self.log(f"branching {self.toSign8(size)} to {hex(self.pc)}", 5)
     
     # BCC: Branch on Carry Clear
-    def __bcc(self, params):
-        self.log(f"bcc {params[0]}", 5)
-        if self.srFlagGet('c') == False:
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bcc(self, operand):
+        if not self.flagC:
+            self.__branch(operand) # function size will be added to pc after exec
     
     # BCS: Branch on Carry Set
-    def __bcs(self, params):
-        self.log(f"bcs {params[0]}", 5)
-        if self.srFlagGet('c'):
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bcs(self, operand):
+        if self.flagC:
+            self.__branch(operand) # function size will be added to pc after exec
             
     # BEQ: Branch on Result Zero
-    def __beq(self, params):
-        self.log(f"beq {params[0]}", 5)
-        if self.srFlagGet('z'):
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __beq(self, operand):
+        if self.flagZ:
+            self.__branch(operand) # function size will be added to pc after exec
             
     # BIT: Test Bits in Memory with Accumulator
     # zero page
-    def __bit24(self, params):
-        address = self.getZeroPageAddress(params)
+    def __bit24(self, operand):
+        address = self.getZeroPageAddress(operand)
         result = self.a & self.rambus.memoryReadCPU(address)
-        self.log(f"bit {result}", 5)
 
         
         # set bits
-        self.srFlagSet('z', result == 0)
-        self.srFlagSet('v', bool((self.rambus.memoryReadCPU(address) >> 6) & 1))
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagZ = result == 0
+        self.flagV = (self.rambus.memoryReadCPU(address) >> 6) & 1
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
         
-    def __bit2C(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __bit2C(self, operand):
+        address = self.getAbsoluteAddress(operand)
         result = self.a & self.rambus.memoryReadCPU(address)
-        self.log(f"bit {result}", 5)
 
         # set bits
-        self.srFlagSet('z', result == 0)
-        self.srFlagSet('v', bool((self.rambus.memoryReadCPU(address) >> 6) & 1))
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagZ = result == 0
+        self.flagV = (self.rambus.memoryReadCPU(address) >> 6) & 1
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
         
     # BMI: Branch on Result Minus
-    def __bmi(self, params):
-        self.log(f"bmi {params[0]}", 5)
-        if self.srFlagGet('n'):
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bmi(self, operand):
+        if self.flagN:
+            self.__branch(operand) # function size will be added to pc after exec
     
     # BNE: Branch on Result Not Zero
-    def __bne(self, params):
-        self.log(f"bne {params[0]}", 5)
-        if self.srFlagGet('z') == False:
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bne(self, operand):
+        if not self.flagZ:
+            self.__branch(operand) # function size will be added to pc after exec
     
     # BPL: Branch on Result Zero
-    def __bpl(self, params):
-        self.log(f"bpl {params[0]}", 5)
-        if self.srFlagGet('n') == False:
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bpl(self, operand):
+        if not self.flagN:
+            self.__branch(operand) # function size will be added to pc after exec
     
     def interrupt(self, handler, isBrk = False):
         # push ret ptr to stack
@@ -590,49 +834,40 @@ class dm6502:
         self.srFlagSet('i', 1)
         
         # set pc to interrupt handler
-        lo = handler & 0xFF
-        hi = (handler >> 8) & 0xFF
-        self.pc = self.getIndirectAddress([lo, hi])
+        self.pc = self.getIndirectAddress(handler)
     
     # BRK: Force Break
-    def __brk(self, params):
+    def __brk(self, operand):
         self.interrupt(0xFFFE, True)
     
     # BVC: Branch on Overflow Clear
-    def __bvc(self, params):
-        self.log(f"bvc {params[0]}", 5)
-        if self.srFlagGet('v') == False:
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bvc(self, operand):
+        if not self.flagV:
+            self.__branch(operand) # function size will be added to pc after exec
             
     # BVS: Branch on Overflow Set
-    def __bvs(self, params):
-        self.log(f"bvs {params[0]}", 5)
-        if self.srFlagGet('v'):
-            self.__branch(params[0]) # function size will be added to pc after exec
+    def __bvs(self, operand):
+        if self.flagV:
+            self.__branch(operand) # function size will be added to pc after exec
 
     # CLC: Clear Carry Flag
-    def __clc(self, params):
-        self.log(f"clc", 5)
-        self.srFlagSet('c', False)
+    def __clc(self, operand):
+        self.flagC = False
     
     # CLD: Clear Decimal Mode
-    def __cld(self, params):
-        self.log(f"cld", 5)
+    def __cld(self, operand):
         self.srFlagSet('d', False)
     
     # CLI: Clear Interrupt Disable Bit
-    def __cli(self, params):
-        self.log(f"cli", 5)
+    def __cli(self, operand):
         self.srFlagSet('i', False)
     
     # CLV: Clear Overflow Flag
-    def __clv(self, params):
-        self.log(f"clv", 5)
-        self.srFlagSet('v', False)
+    def __clv(self, operand):
+        self.flagV = False
         
     # CMP: Compare Memory with Accumulator
     def __cmp(self, memory, register = None):
-        self.log(f"cmp {memory}", 5) # TODO: fix instruction name print for cpx and cpy
         # for other cmps
         if (register == None):
             register = self.a
@@ -640,245 +875,236 @@ class dm6502:
         result = (register - memory) & 0xFF # no idea if this should wraparound or not
         
         # set flags
-        self.srFlagSet('c', register >= memory)
-        self.srFlagSet('z', register == memory)
-        self.srFlagSet('n', bool((result >> 7) & 1))
+        self.flagC = register >= memory
+        self.flagZ = register == memory
+        self.flagN = (result >> 7) & 1
     
     # immediate
-    def __cmpC9(self, params):
-        self.__cmp(params[0])
+    def __cmpC9(self, operand):
+        self.__cmp(operand)
         
     # zeropage
-    def __cmpC5(self, params):
-        address = self.getZeroPageAddress(params)
+    def __cmpC5(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
     
     # zeropage x
-    def __cmpD5(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __cmpD5(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
         
     # absolute
-    def __cmpCD(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __cmpCD(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
         
     # absolute x
-    def __cmpDD(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __cmpDD(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
         
     # absolute y
-    def __cmpD9(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __cmpD9(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
     
     # indirect x
-    def __cmpC1(self, params):
-        address = self.getIndirectXAddress(params)
+    def __cmpC1(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
     
     # indirect y
-    def __cmpD1(self, params):
-        address = self.getIndirectYAddress(params)
+    def __cmpD1(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address))
     
     # CPX: Compare Memory and Index X
     # immediate
-    def __cpxE0(self, params):
-        self.__cmp(params[0], self.x)
+    def __cpxE0(self, operand):
+        self.__cmp(operand, self.x)
     
     # zeropage
-    def __cpxE4(self, params):
-        address = self.getZeroPageAddress(params)
+    def __cpxE4(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address), self.x)
     
     # absolute
-    def __cpxEC(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __cpxEC(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address), self.x)
     
     # CPX: Compare Memory and Index Y
     # immediate
-    def __cpyC0(self, params):
-        self.__cmp(params[0], self.y)
+    def __cpyC0(self, operand):
+        self.__cmp(operand, self.y)
     
     # zeropage
-    def __cpyC4(self, params):
-        address = self.getZeroPageAddress(params)
+    def __cpyC4(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address), self.y)
     
     # absolute
-    def __cpyCC(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __cpyCC(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__cmp(self.rambus.memoryReadCPU(address), self.y)
         
     # DEC: Decrement Memory by One
     def __dec(self, address):
-        self.log(f"dec {address}", 5)
         
         # self.memory[address] -= 1
         # self.memory[address] &= 0xFF        
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) - 1) & 0xFF)
         
         # update flags
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
         
     # zeropage
-    def __decC6(self, params):
-        address = self.getZeroPageAddress(params)
+    def __decC6(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__dec(address)
         
     # zeropage x
-    def __decD6(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __decD6(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__dec(address)
         
     # absolute
-    def __decCE(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __decCE(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__dec(address)
         
     # absolute x
-    def __decDE(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __decDE(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__dec(address)
     
     # DEX: Decrement Index X by One
-    def __dex(self, params):
-        self.log(f"dex", 5)
+    def __dex(self, operand):
         self.x -= 1
         self.x &= 0xFF
         # update flags
-        self.srFlagSet('z', self.x == 0)
-        self.srFlagSet('n', bool((self.x >> 7) & 1))
+        self.flagZ = self.x == 0
+        self.flagN = (self.x >> 7) & 1
 
     # DEY: Decrement Index Y by One
-    def __dey(self, params):
-        self.log(f"dey", 5)
+    def __dey(self, operand):
         self.y -= 1
         self.y &= 0xFF
         # update flags
-        self.srFlagSet('z', self.y == 0)
-        self.srFlagSet('n', bool((self.y >> 7) & 1))
+        self.flagZ = self.y == 0
+        self.flagN = (self.y >> 7) & 1
         
     # EOR: Exclusive-OR Memory with Accumulator
     def __eor(self, memory):
-        self.log(f"eor {memory}", 5)
         self.a ^= memory
         # set flags
-        self.srFlagSet('z', self.a == 0)
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagZ = self.a == 0
+        self.flagN = (self.a >> 7) & 1
         
     # immediate
-    def __eor49(self, params):
-        self.__eor(params[0])
+    def __eor49(self, operand):
+        self.__eor(operand)
         
     # zeropage
-    def __eor45(self, params):
-        address = self.getZeroPageAddress(params)
+    def __eor45(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # zeropage x
-    def __eor55(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __eor55(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # absolute
-    def __eor4D(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __eor4D(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # absolute x
-    def __eor5D(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __eor5D(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # absolute y
-    def __eor59(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __eor59(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # indirect x
-    def __eor41(self, params):
-        address = self.getIndirectXAddress(params)
+    def __eor41(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # indirect y
-    def __eor51(self, params):
-        address = self.getIndirectYAddress(params)
+    def __eor51(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__eor(self.rambus.memoryReadCPU(address))
         
     # INC: Incrament Memory by One
     def __inc(self, address):
-        self.log(f"inc {address}", 5)
         # self.memory[address] += 1
         # self.memory[address] &= 0xFF
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) + 1) & 0xFF)
         # update flags
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
         
     # zeropage
-    def __incE6(self, params):
-        address = self.getZeroPageAddress(params)
+    def __incE6(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__inc(address)
         
     # zeropage x
-    def __incF6(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __incF6(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__inc(address)
         
     # absolute
-    def __incEE(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __incEE(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__inc(address)
         
     # absolute x
-    def __incFE(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __incFE(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__inc(address)
     
     # INX: Increment Index X by One
-    def __inx(self, params):
-        self.log(f"inx", 5)
+    def __inx(self, operand):
         self.x += 1
         self.x &= 0xFF
         # update flags
-        self.srFlagSet('z', self.x == 0)
-        self.srFlagSet('n', bool((self.x >> 7) & 1))
+        self.flagZ = self.x == 0
+        self.flagN = (self.x >> 7) & 1
 
     # INY: Increment Index Y by One
-    def __iny(self, params):
-        self.log(f"iny", 5)
+    def __iny(self, operand):
         self.y += 1
         self.y &= 0xFF
         # update flags
-        self.srFlagSet('z', self.y == 0)
-        self.srFlagSet('n', bool((self.y >> 7) & 1))
+        self.flagZ = self.y == 0
+        self.flagN = (self.y >> 7) & 1
         
     # JMP: Jump to New Location
     def __jmp(self, address):
-        self.log(f"jmp {address}", 5)
         self.pc = address - 3 # function size will be added to pc after exec
     
     # absolute
-    def __jmp4C(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __jmp4C(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__jmp(address)
         
     # indirect
-    def __jmp6C(self, params):
-        address = self.getIndirectAddress(params)
+    def __jmp6C(self, operand):
+        address = self.getIndirectAddress(operand)
         self.__jmp(address)
         
     # JSR: Jump to New Location Saving Return Address
-    def __jsr(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __jsr(self, operand):
+        address = self.getAbsoluteAddress(operand)
         # this is pretty much a call, pushes return address to top of stack for later
         ret = self.pc+2
-        self.log(f"jsr {hex(address)}; ret to {hex(ret)}", 5)
         hibyte = (ret >> 8) & 0xFF
         lobyte = ret & 0xFF
         self.stackPush(hibyte)
@@ -887,333 +1113,319 @@ class dm6502:
         
     # LDA: Load Accumulator with Memory
     def __lda(self, memory):
-        self.log(f"lda {memory}", 5)
         self.a = memory
         # set flags
-        self.srFlagSet('z', memory == 0)
-        self.srFlagSet('n', bool((memory >> 7) & 1))
+        self.flagZ = memory == 0
+        self.flagN = (memory >> 7) & 1
         
     # immediate
-    def __ldaA9(self, params):
-        self.__lda(params[0])
+    def __ldaA9(self, operand):
+        self.__lda(operand)
     
     # zeropage
-    def __ldaA5(self, params):
-        address = self.getZeroPageAddress(params)
+    def __ldaA5(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
     
     # zeropage x
-    def __ldaB5(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __ldaB5(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __ldaAD(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __ldaAD(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
         
     # absolute x
-    def __ldaBD(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __ldaBD(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
 
     # absolute y
-    def __ldaB9(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __ldaB9(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
     
     # indirect x
-    def __ldaA1(self, params):
-        address = self.getIndirectXAddress(params)
+    def __ldaA1(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
 
     # indirect y
-    def __ldaB1(self, params):
+    def __ldaB1(self, operand):
         # val = PEEK(PEEK(arg) + PEEK((arg + 1) % 256) * 256 + Y)
-        address = self.getIndirectYAddress(params)
+        address = self.getIndirectYAddress(operand)
         self.__lda(self.rambus.memoryReadCPU(address))
                 
     # LDX: Load Index X with Memory
     def __ldx(self, memory):
-        self.log(f"ldx {memory}", 5)
         self.x = memory
         # set flags
-        self.srFlagSet('z', memory == 0)
-        self.srFlagSet('n', bool((memory >> 7) & 1))
+        self.flagZ = memory == 0
+        self.flagN = (memory >> 7) & 1
     
     # immediate
-    def __ldxA2(self, params):
-        self.__ldx(params[0])
+    def __ldxA2(self, operand):
+        self.__ldx(operand)
     
     # zeropage
-    def __ldxA6(self, params):
-        address = self.getZeroPageAddress(params)
+    def __ldxA6(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__ldx(self.rambus.memoryReadCPU(address))
         
     # zeropage y
-    def __ldxB6(self, params):
-        address = self.getZeroPageYAddress(params)
+    def __ldxB6(self, operand):
+        address = self.getZeroPageYAddress(operand)
         self.__ldx(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __ldxAE(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __ldxAE(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__ldx(self.rambus.memoryReadCPU(address))
     
     # absolute y
-    def __ldxBE(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __ldxBE(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__ldx(self.rambus.memoryReadCPU(address))
     
     # LDY: Load Index Y with Memory
     def __ldy(self, memory):
-        self.log(f"ldy {memory}", 5)
         self.y = memory
         # set flags
-        self.srFlagSet('z', memory == 0)
-        self.srFlagSet('n', bool((memory >> 7) & 1))
+        self.flagZ = memory == 0
+        self.flagN = (memory >> 7) & 1
     
     # immediate
-    def __ldyA0(self, params):
-        self.__ldy(params[0])
+    def __ldyA0(self, operand):
+        self.__ldy(operand)
     
     # zeropage
-    def __ldyA4(self, params):
-        address = self.getZeroPageAddress(params)
+    def __ldyA4(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__ldy(self.rambus.memoryReadCPU(address))
         
     # zeropage x
-    def __ldyB4(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __ldyB4(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__ldy(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __ldyAC(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __ldyAC(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__ldy(self.rambus.memoryReadCPU(address))
     
     # absolute x
-    def __ldyBC(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __ldyBC(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__ldy(self.rambus.memoryReadCPU(address))
     
     # LSR: Shift One Bit Right (Memory or Accumulator)
     def __lsr(self, address):
-        self.log(f"lsr {address}", 5)
         old = self.rambus.memoryReadCPU(address)
         # self.memory[address] = self.memory[address] >> 1
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) >> 1) & 0xFF)
         # set status flags
-        self.srFlagSet('c', bool(old & 1))
-        self.srFlagSet('n', False)
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
+        self.flagC = old & 1
+        self.flagN = 0
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
         
     # accumulator
-    def __lsr4A(self, params):
-        self.log(f"lsr accumulator", 5)
+    def __lsr4A(self, operand):
         old = self.a
         self.a = self.a >> 1
         self.a &= 0xFF
         # set status flags
-        self.srFlagSet('c', bool(old & 1))
-        self.srFlagSet('n', False)
-        self.srFlagSet('z', self.a == 0)
+        self.flagC = old & 1
+        self.flagN = 0
+        self.flagZ = self.a == 0
         
     # zeropage
-    def __lsr46(self, params):
-        address = self.getZeroPageAddress(params)
+    def __lsr46(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__lsr(address)
         
     # zeropage x
-    def __lsr56(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __lsr56(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__lsr(address)
     
     # absolute
-    def __lsr4E(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __lsr4E(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__lsr(address)
     
     # absolute x
-    def __lsr5E(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __lsr5E(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__lsr(address)
     
     # NOP: No Operation
-    def __nop(self, params):
-        self.log("nop", 5)
+    def __nop(self, operand):
+        pass
     
     # ORA: OR Memory with Accumulator
     def __ora(self, memory):
-        self.log(f"ora {memory}", 5)
         self.a |= memory
         # set cpu flags
-        self.srFlagSet('z', self.a == 0)
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagZ = self.a == 0
+        self.flagN = (self.a >> 7) & 1
     
     # immediate
-    def __ora09(self, params):
-        self.__ora(params[0])
+    def __ora09(self, operand):
+        self.__ora(operand)
         
     # zeropage
-    def __ora05(self, params):
-        address = self.getZeroPageAddress(params)
+    def __ora05(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
         
     # zeropage x
-    def __ora15(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __ora15(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
         
     # absolute
-    def __ora0D(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __ora0D(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
         
     # absolute x
-    def __ora1D(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __ora1D(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
         
     # absolute y
-    def __ora19(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __ora19(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
         
     # indirect x
-    def __ora01(self, params):
-        address = self.getIndirectXAddress(params)
+    def __ora01(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
     
     # indirect y
-    def __ora11(self, params):
-        address = self.getIndirectYAddress(params)
+    def __ora11(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__ora(self.rambus.memoryReadCPU(address))
     
     # PHA: Push Accumulator on Stack
-    def __pha(self, params):
-        self.log(f"pha {self.a}", 5)
+    def __pha(self, operand):
         self.stackPush(self.a)
     
     # PHP: Push Processor Status on Stack
-    def __php(self, params):
-        self.log(f"php {self.sr}", 5)
+    def __php(self, operand):
         res = self.sr | 0b00110000 # modified before push
         self.stackPush(res)
         
     # PLA: Pull Accumulator from Stack
-    def __pla(self, params):
+    def __pla(self, operand):
         self.a = self.stackPull()
-        self.log(f"pla {self.a}", 5)
         
         # set cpu flags
-        self.srFlagSet('z', self.a == 0)
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagZ = self.a == 0
+        self.flagN = (self.a >> 7) & 1
         
     # PLP: Pull Processor Status from Stack
-    def __plp(self, params):
+    def __plp(self, operand):
         # TODO: interrupt disable delayed 1 instruction
         old = (self.sr & 0b00110000) # save only 2 old bits
         self.sr = (self.stackPull() & 0b11001111) | old # set the status register
-        self.log(f"plp {self.sr}", 5)
         
     # ROL: Rotate One Bit Left (Memory or Accumulator)
     def __rol(self, address):
         # Move each of the bits in either A or M one place to the left. Bit 0 is filled with the current value of the carry flag whilst the old bit 7 becomes the new carry flag value.
-        self.log(f"rol {address}", 5)
         old = self.rambus.memoryReadCPU(address)
         # self.memory[address] = self.memory[address] << 1 # Move each of the bits in either A or M one place to the left
-        # self.memory[address] |= int(self.srFlagGet('c')) # Bit 0 is filled with the current value of the carry flag
+        # self.memory[address] |= self.flagC # Bit 0 is filled with the current value of the carry flag
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) << 1) & 0xFF) # Move each of the bits in either A or M one place to the left
-        self.rambus.memoryWriteCPU(address, self.rambus.memoryReadCPU(address) | int(self.srFlagGet('c'))) # Bit 0 is filled with the current value of the carry flag
+        self.rambus.memoryWriteCPU(address, self.rambus.memoryReadCPU(address) | self.flagC) # Bit 0 is filled with the current value of the carry flag
         # set all da flags
-        self.srFlagSet('c', bool((old >> 7) & 1)) # the old bit 7 becomes the new carry flag value
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagC = (old >> 7) & 1 # the old bit 7 becomes the new carry flag value
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
     
     # accumulator
-    def __rol2A(self, params):
+    def __rol2A(self, operand):
         # Move each of the bits in either A or M one place to the left. Bit 0 is filled with the current value of the carry flag whilst the old bit 7 becomes the new carry flag value.
-        self.log(f"rol A", 5)
         old = self.a
         self.a = (self.a << 1) & 0xFF # Move each of the bits in either A or M one place to the left
-        self.a |= int(self.srFlagGet('c')) # Bit 0 is filled with the current value of the carry flag
+        self.a |= self.flagC # Bit 0 is filled with the current value of the carry flag
         # set all da flags
-        self.srFlagSet('c', bool((old >> 7) & 1)) # the old bit 7 becomes the new carry flag value
-        self.srFlagSet('z', self.a == 0)
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagC = (old >> 7) & 1 # the old bit 7 becomes the new carry flag value
+        self.flagZ = self.a == 0
+        self.flagN = (self.a >> 7) & 1
         
     # zeropage
-    def __rol26(self, params):
-        addr = self.getZeroPageAddress(params)
+    def __rol26(self, operand):
+        addr = self.getZeroPageAddress(operand)
         self.__rol(addr)
         
     # zeropage x
-    def __rol36(self, params):
-        addr = self.getZeroPageXAddress(params)
+    def __rol36(self, operand):
+        addr = self.getZeroPageXAddress(operand)
         self.__rol(addr)
     
     # absolute
-    def __rol2E(self, params):
-        addr = self.getAbsoluteAddress(params)
+    def __rol2E(self, operand):
+        addr = self.getAbsoluteAddress(operand)
         self.__rol(addr)
     
     # absolute x
-    def __rol3E(self, params):
-        addr = self.getAbsoluteXAddress(params)
+    def __rol3E(self, operand):
+        addr = self.getAbsoluteXAddress(operand)
         self.__rol(addr)
         
     # ROL: Rotate Right Bit Left (Memory or Accumulator)
     def __ror(self, address):
         # Move each of the bits in either A or M one place to the right. Bit 7 is filled with the current value of the carry flag whilst the old bit 0 becomes the new carry flag value. 
-        self.log(f"rol {address}", 5)
         old = self.rambus.memoryReadCPU(address)
         # self.memory[address] = self.memory[address] >> 1 # Move each of the bits in either A or M one place to the right
-        # self.memory[address] |= ((int(self.srFlagGet('c'))) << 7) # Bit 7 is filled with the current value of the carry flag
+        # self.memory[address] |= ((self.flagC) << 7) # Bit 7 is filled with the current value of the carry flag
         self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) >> 1) & 0xFF) # Move each of the bits in either A or M one place to the right
-        self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) | ((int(self.srFlagGet('c'))) << 7)) & 0xFF) # Bit 7 is filled with the current value of the carry flag
+        self.rambus.memoryWriteCPU(address, (self.rambus.memoryReadCPU(address) | ((self.flagC) << 7)) & 0xFF) # Bit 7 is filled with the current value of the carry flag
         
         # set all da flags
-        self.srFlagSet('c', bool(old & 1)) # the old bit 0 becomes the new carry flag value
-        self.srFlagSet('z', self.rambus.memoryReadCPU(address) == 0)
-        self.srFlagSet('n', bool((self.rambus.memoryReadCPU(address) >> 7) & 1))
+        self.flagC = old & 1 # the old bit 0 becomes the new carry flag value
+        self.flagZ = self.rambus.memoryReadCPU(address) == 0
+        self.flagN = (self.rambus.memoryReadCPU(address) >> 7) & 1
         
     # accumulator
-    def __ror6A(self, params):
+    def __ror6A(self, operand):
         # Move each of the bits in either A or M one place to the right. Bit 7 is filled with the current value of the carry flag whilst the old bit 0 becomes the new carry flag value. 
-        self.log(f"ror A", 5)
         old = self.a
         self.a = self.a >> 1 # Move each of the bits in either A or M one place to the right
         self.a &= 0xFF
-        self.a |= ((int(self.srFlagGet('c'))) << 7) # Bit 7 is filled with the current value of the carry flag
+        self.a |= ((self.flagC) << 7) # Bit 7 is filled with the current value of the carry flag
         self.a &= 0xFF
         # set all da flags
-        self.srFlagSet('c', bool(old & 1)) # the old bit 0 becomes the new carry flag value
-        self.srFlagSet('z', self.a == 0)
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
+        self.flagC = old & 1 # the old bit 0 becomes the new carry flag value
+        self.flagZ = self.a == 0
+        self.flagN = (self.a >> 7) & 1
         
     # zeropage
-    def __ror66(self, params):
-        addr = self.getZeroPageAddress(params)
+    def __ror66(self, operand):
+        addr = self.getZeroPageAddress(operand)
         self.__ror(addr)
     
     # zeropage x
-    def __ror76(self, params):
-        addr = self.getZeroPageXAddress(params)
+    def __ror76(self, operand):
+        addr = self.getZeroPageXAddress(operand)
         self.__ror(addr)
     
     # absolute
-    def __ror6E(self, params):
-        addr = self.getAbsoluteAddress(params)
+    def __ror6E(self, operand):
+        addr = self.getAbsoluteAddress(operand)
         self.__ror(addr)
         
     # absolute x
-    def __ror7E(self, params):
-        addr = self.getAbsoluteXAddress(params)
+    def __ror7E(self, operand):
+        addr = self.getAbsoluteXAddress(operand)
         self.__ror(addr)
     
     # RTI: Return from Interrupt
-    def __rti(self, params):
+    def __rti(self, operand):
         old = (self.sr & 0b00110000) # save only 2 old bits
         
         flags = (self.stackPull()) & 0b11001111 # 2 flags are ignored
@@ -1224,215 +1436,200 @@ class dm6502:
         self.sr = flags | old
         # self.pc = (lobyte & 0xFF) | ((hibyte << 8) & 0xFF)
         self.pc = (((lobyte & 0xFF) | (hibyte << 8)) - 1) & 0xFFFF # limit to 16 bit address space
-        self.log(f"rti {self.pc}", 5)
         
     # RTS: Return from Subroutine
-    def __rts(self, params):
+    def __rts(self, operand):
         lobyte = self.stackPull()
         hibyte = self.stackPull()
         self.pc = (((lobyte & 0xFF) | (hibyte << 8))) & 0xFFFF # limit to 16 bit address space
-        self.log(f"rts {hex(self.pc)}", 5)
 
     
     # SBC: Subtract Memory from Accumulator with Borrow
     def __sbc(self, memory):
         # initial operation
         oldA = self.a
-        result = self.a - memory - int(not self.srFlagGet('c'))
+        result = self.a - memory - int(not self.flagC)
         
         # weird flagset
-        self.srFlagSet('c', bool(result >= 0)) # ~(result < $00) but its unsigned here
+        self.flagC = result >= 0 # ~(result < $00) but its unsigned here
         
         # do 8bit wrap to val and do rest of flags
         self.a = result & 0xFF
-        self.srFlagSet('v', bool((self.a ^ oldA) & (self.a ^ ~memory) & 0x80)) # (result ^ A) & (result ^ ~memory) & $80
-        self.srFlagSet('z', self.a == 0) # result == 0
-        self.srFlagSet('n', bool((self.a >> 7) & 1))
-        self.log(f"sbc {self.a}", 5)
+        self.flagV = bool((self.a ^ oldA) & (self.a ^ ~memory) & 0x80) # (result ^ A) & (result ^ ~memory) & $80
+        self.flagZ = self.a == 0 # result == 0
+        self.flagN = (self.a >> 7) & 1
         
     # immediate
-    def __sbcE9(self, params):
-        self.__sbc(params[0])
+    def __sbcE9(self, operand):
+        self.__sbc(operand)
     
     # zeropage
-    def __sbcE5(self, params):
-        address = self.getZeroPageAddress(params)
+    def __sbcE5(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
         
     # zeropage x
-    def __sbcF5(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __sbcF5(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
     
     # absolute
-    def __sbcED(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __sbcED(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
     
     # absolute x
-    def __sbcFD(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __sbcFD(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
         
     # absolute y
-    def __sbcF9(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __sbcF9(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
         
     # indirect x
-    def __sbcE1(self, params):
-        address = self.getIndirectXAddress(params)
+    def __sbcE1(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
         
     # indirect y
-    def __sbcF1(self, params):
-        address = self.getIndirectYAddress(params)
+    def __sbcF1(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__sbc(self.rambus.memoryReadCPU(address))
     
     # SEC: Set Carry Flag
-    def __sec(self, params):
-        self.log("sec", 5)
-        self.srFlagSet('c', True)
+    def __sec(self, operand):
+        self.flagC = True
     
     # SED: Set Decimal Flag
-    def __sed(self, params):
-        self.log("sed", 5)
+    def __sed(self, operand):
         self.srFlagSet('d', True)
         
     # SEI: Set Interrupt Disable Status
-    def __sei(self, params):
-        self.log("sei", 5)
+    def __sei(self, operand):
         self.srFlagSet('i', True) # TODO: this is delayed by 1 instruction
     
     # STA: Store Accumulator in Memory
     def __sta(self, address):
         # self.memory[address] = self.a
         self.rambus.memoryWriteCPU(address, self.a)
-        self.log(f"sta {self.a}", 5)
         
     # zeropage
-    def __sta85(self, params):
-        address = self.getZeroPageAddress(params)
+    def __sta85(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__sta(address)
     
     # zeropage x
-    def __sta95(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __sta95(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__sta(address)
     
     # absolute
-    def __sta8D(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __sta8D(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__sta(address)
         
     # absolute x
-    def __sta9D(self, params):
-        address = self.getAbsoluteXAddress(params)
+    def __sta9D(self, operand):
+        address = self.getAbsoluteXAddress(operand)
         self.__sta(address)
     
     # absolute y
-    def __sta99(self, params):
-        address = self.getAbsoluteYAddress(params)
+    def __sta99(self, operand):
+        address = self.getAbsoluteYAddress(operand)
         self.__sta(address)
         
     # indirect x
-    def __sta81(self, params):
-        address = self.getIndirectXAddress(params)
+    def __sta81(self, operand):
+        address = self.getIndirectXAddress(operand)
         self.__sta(address)
         
     # indirect y
-    def __sta91(self, params):
-        address = self.getIndirectYAddress(params)
+    def __sta91(self, operand):
+        address = self.getIndirectYAddress(operand)
         self.__sta(address)
         
     # STX: Store Index X in Memory
     def __stx(self, address):
         # self.memory[address] = self.x
         self.rambus.memoryWriteCPU(address, self.x)
-        self.log(f"stx {self.x}", 5)
         
     # zeropage
-    def __stx86(self, params):
-        address = self.getZeroPageAddress(params)
+    def __stx86(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__stx(address)
     
     # zeropage y
-    def __stx96(self, params):
-        address = self.getZeroPageYAddress(params)
+    def __stx96(self, operand):
+        address = self.getZeroPageYAddress(operand)
         self.__stx(address)
     
     # absolute
-    def __stx8E(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __stx8E(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__stx(address)
         
     # STY: Store Index Y in Memory
     def __sty(self, address):
         # self.memory[address] = self.y
         self.rambus.memoryWriteCPU(address, self.y)
-        self.log(f"sty {self.y}", 5)
     
     # zeropage
-    def __sty84(self, params):
-        address = self.getZeroPageAddress(params)
+    def __sty84(self, operand):
+        address = self.getZeroPageAddress(operand)
         self.__sty(address)
     
     # zeropage x
-    def __sty94(self, params):
-        address = self.getZeroPageXAddress(params)
+    def __sty94(self, operand):
+        address = self.getZeroPageXAddress(operand)
         self.__sty(address)
     
     # absolute
-    def __sty8C(self, params):
-        address = self.getAbsoluteAddress(params)
+    def __sty8C(self, operand):
+        address = self.getAbsoluteAddress(operand)
         self.__sty(address)
         
     # TAX: Transfer Accumulator to Index X
-    def __tax(self, params):
+    def __tax(self, operand):
         self.x = self.a
         # set flags
-        self.srFlagSet('z', self.x == 0)
-        self.srFlagSet('n', bool((self.x >> 7) & 1))
-        self.log(f"tax {self.x}", 5)
+        self.flagZ = self.x == 0
+        self.flagN = (self.x >> 7) & 1
     
     # TAY: Transfer Accumulator to Index Y
-    def __tay(self, params):
+    def __tay(self, operand):
         self.y = self.a
         # set flags
-        self.srFlagSet('z', self.y == 0)
-        self.srFlagSet('n', bool((self.y >> 7) & 1))
-        self.log(f"tay {self.y}", 5)
+        self.flagZ = self.y == 0
+        self.flagN = (self.y >> 7) & 1
     
     # TSX: Transfer Stack Pointer to Index X
-    def __tsx(self, params):
+    def __tsx(self, operand):
         self.x = self.sp
         # set flags
-        self.srFlagSet('z', self.x == 0)
-        self.srFlagSet('n', bool((self.x >> 7) & 1))
-        self.log(f"tsx {self.x}", 5)
+        self.flagZ = self.x == 0
+        self.flagN = (self.x >> 7) & 1
         
     # TXA: Transfer Index X to Accumulator
-    def __txa(self, params):
+    def __txa(self, operand):
         self.a = self.x
         # set flags
-        self.srFlagSet('z', self.x == 0)
-        self.srFlagSet('n', bool((self.x >> 7) & 1))
-        self.log(f"txa {self.x}", 5)
+        self.flagZ = self.x == 0
+        self.flagN = (self.x >> 7) & 1
     
     # TXS: Transfer Index X to Stack Pointer
-    def __txs(self, params):
+    def __txs(self, operand):
         self.sp = self.x
-        self.log(f"txs {self.x}", 5)
     
     # TYA: Transfer Index Y to Accumulator
-    def __tya(self, params):
+    def __tya(self, operand):
         self.a = self.y
         # set flags
-        self.srFlagSet('z', self.y == 0)
-        self.srFlagSet('n', bool((self.y >> 7) & 1))
-        self.log(f"tya {self.y}", 5)
+        self.flagZ = self.y == 0
+        self.flagN = (self.y >> 7) & 1
         
-    def __tst(self, params):
+    def __tst(self, operand):
         if self.testmode:
             # print("Test complete. Please compare the output with the expected output at testcase.txt.")
             with open("testcase.txt", "r") as tc:
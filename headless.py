@@ -0,0 +1,28 @@
+import numpy as np
+
+# stands in for dmslopywindow when there is no screen (ci, batch runs), no pygame needed
+# the ppu still draws every frame into pixels so a run can be checked afterwards
+class dmheadlesswindow():
+    def __init__(self):
+        self.pixels = np.zeros((240, 256), dtype=np.uint8)
+        self.palette = None
+        self.frames = 0
+        
+        self.presentTime = 0
+        self.presentTimeTotal = 0
+    
+    def setScaleMode(self, integerScale):
+        pass
+    
+    def setPalette(self, colors):
+        self.palette = colors
+    
+    def handleEvents(self):
+        pass
+    
+    def present(self):
+        self.frames += 1
+    
+    # the last frame as rgb bytes (rows of 256 pixels)
+    def frameRGB(self):
+        return np.array(self.palette, dtype=np.uint8)[self.pixels].tobytes()
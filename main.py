@@ -1,68 +1,103 @@
 # builtin modules import
-import sys
+import time
+import argparse
 
 # my own modules import
 from cpu import *
 from ppu import *
 from bus import *
 from pad import *
+from pacer import *
+from mapper import *
+from rom import *
+from savestate import *
+from rewind import *
+
+parser = argparse.ArgumentParser(description="slop python emulator for a certain system from the 80s")
+parser.add_argument("romfile", nargs="?", help="iNES rom to run (\"testrom\" for the cpu test)")
+parser.add_argument("--no-blocks", action="store_true", help="interpret one instruction at a time instead of using the block cache (the cache only helps code that runs over and over, which games do)")
+parser.add_argument("--no-idle-skip", action="store_true", help="don't fast forward spin loops to the next ppu event")
+parser.add_argument("--idle-stats", action="store_true", help="print how many cpu cycles were skipped in idle loops each frame")
+parser.add_argument("--render-stats", action="store_true", help="print how many background tiles were redrawn and how long presenting took each frame")
+parser.add_argument("--integer-scale", action="store_true", help="only scale the picture by whole multiples (sharper and cheaper, leaves black bars)")
+parser.add_argument("--headless", action="store_true", help="no window and no frame limit, frames are drawn into memory only")
+parser.add_argument("--speed", type=float, help="emulation speed, 1 is real time, 2 double, 0 as fast as possible (default 1, 0 when headless)")
+parser.add_argument("--load-state", help="start from a save state file")
+parser.add_argument("--save-state", help="write a save state here when the run ends (see --frames)")
+parser.add_argument("--save-every", type=int, help="also write --save-state every n frames, for checkpointing long runs")
+parser.add_argument("--rewind-seconds", type=float, default=0, help="keep this many seconds of frames to rewind through by holding backspace (0 is off)")
+parser.add_argument("--rewind-mb", type=float, default=16, help="memory cap for the rewind buffer in megabytes")
+parser.add_argument("--rewind-stats", action="store_true", help="print rewind buffer size and capture time every second")
+parser.add_argument("--frameskip", type=int, default=0, help="only draw every n+1th frame")
+parser.add_argument("--frames", type=int, help="exit after this many frames")
+parser.add_argument("--input", help="input script to play instead of the keyboard (lines of \"frame buttons\", see pad.py)")
+args = parser.parse_args()
 
 # python should let this var be used out of the if block
-if len(sys.argv) == 1:
+if args.romfile is None:
     filename = input("Enter the romfile name (enter \"testrom\" for test rom): ")
 else:
-    filename = sys.argv[1]
-
-# load the rom
-with open(filename, "rb") as file:
-    romfile = list(file.read())
-    
-header = romfile[0:4]
-if not (header == [78, 69, 83, 26]):
-    raise FileNotFoundError("The file is not an iNES file")
-    
-prgRom = romfile[4] # number of code banks (*16kb)
-chrRom = romfile[5] # number of graphics banks (*8kb)
-
-# control bytes bitmask
-ctrl1 = romfile[6] # six
-ctrl2 = romfile[7] # sevennnnnnnn
-hasTrainer = (ctrl1 >> 2) & 1 # need to skip 512 bytes if this is present
-isVertical = bool(ctrl1 & 1) # if false then game mirrors horizontal
-is4Screen = bool((ctrl1 >> 3) & 1)
+    filename = args.romfile
 
-prgStart = 16 + (hasTrainer * 512)
-chrStart = prgStart + (16384 * prgRom)
+# load the rom, it gets mapped from the file and prg/chr are views into that, not copies
+rom = dmrom(filename)
 
-prg = romfile[prgStart:chrStart]
-if prgRom == 1:
-    prg += prg # mirroring if only 1 rom
-
-chr = romfile[chrStart:] # best if i limit this for sanity
-
-bus = dmrambus(isVertical)
+bus = dmrambus(rom.header.isVertical)
 cpu = dm6502(bus, 0) # has ram mirrored by bus
-ppu = dmppu(bus, 5) # has its own ram too
-pad = dmjoypad(bus)
+if args.headless:
+    from headless import *
+    ppu = dmppu(bus, 5, dmheadlesswindow()) # has its own ram too
+else:
+    ppu = dmppu(bus, 5) # has its own ram too
+if args.input:
+    pad = dmjoypad(bus, loadInputScript(args.input))
+elif args.headless:
+    pad = dmjoypad(bus, []) # nobody is pressing anything
+else:
+    pad = dmjoypad(bus)
+pad.frame = lambda: ppu.cycles // 89342
+
+if args.speed is None:
+    args.speed = 0 if args.headless else 1
+pacer = dmpacer(args.speed, args.frameskip)
+ppu.pacer = pacer
+ppu.renderStats = args.render_stats
+ppu.window.setScaleMode(args.integer_scale)
+ppu.clock = lambda: cpu.cycles * 3 # register writes get timestamped by the cpu, the ppu runs behind
 
-# load prgrom into cpu
-bus.cpumem[0x8000:0x10000] = prg
-cpu.pc = cpu.getIndirectAddress([0xfc, 0xff]) # needs to point to reset vector
+# plug the cartridge in, the mapper points the bus at prg/chr banks (16kb carts get mirrored there)
+mapper = makeMapper(rom.header.mapper, bus, rom.prg, rom.chr, rom.header.mirroring)
+cpu.pc = cpu.getIndirectAddress(0xfffc) # needs to point to reset vector
 if filename == "testrom":
     cpu.pc = 0xC000
     cpu.testmode = True
 print(f"Program ROM loaded with entrypoint {hex(cpu.pc)}")
-
-# load chrrom into ppu
-bus.ppumem[0x0:0x2000] = chr[0x0:0x2000]
-bus.isVertical = isVertical
-ppu.buildPatternTable()
-print(f"CHR ROM and mirror data loaded into PPU")
+print(f"CHR ROM and mirror data loaded into PPU (mapper {rom.header.mapper})")
 
 # input("Press ENTER to start emulation!")
 
+stateParts = [cpu, ppu, bus, pad, mapper]
+if args.load_state:
+    with open(args.load_state, "rb") as file:
+        loadState(stateParts, file.read())
+    pacer.frames = ppu.cycles // 89342
+    print(f"Loaded save state {args.load_state} at frame {pacer.frames}")
+
+rewinder = None
+if args.rewind_seconds > 0:
+    rewinder = dmrewind(stateParts, args.rewind_seconds, args.rewind_mb)
+
+def writeState():
+    with open(args.save_state, "wb") as file:
+        file.write(saveState(stateParts))
+
 breakpoints = []
 stepping = False
+useBlocks = not args.no_blocks
+idleSkip = not args.no_idle_skip
+idleHead = None # loop head seen last time, skipping needs one full iteration first
+idleEnd = None # address of that loop's jump back
+idleSkipped = 0 # this frame, for --idle-stats
 
 # testcase generator
 if cpu.testmode:
@@ -72,17 +107,11 @@ if cpu.testmode:
     print("Beginning CPU sanity check. If this takes more than a couple seconds, the CPU isn't working properly!")
 
 # main loop
-cpuCyclesOld = 0
-while True:
-    if (cpu.pc in breakpoints):
-        print(f"Breakpoint {hex(cpu.pc)} hit! A {hex(cpu.a)} X {hex(cpu.x)} Y {hex(cpu.y)} SR {hex(cpu.sr)} SP {hex(cpu.sp)}")
-        stepping = True
-    if stepping:
-        t = input()
-        print(f"A {hex(cpu.a)} X {hex(cpu.x)} Y {hex(cpu.y)} SR {hex(cpu.sr)} SP {hex(cpu.sp)}")
-        if len(t) > 0:
-            stepping = False
-    
+# the ppu only does something at a few events per frame (see ppu.nextEvent), so the cpu
+# runs until the next one and then the ppu catches up in one call
+startTime = time.perf_counter()
+startFrame = ppu.cycles // 89342 # not 0 after --load-state
+while args.frames is None or ppu.cycles < args.frames * 89342:
     if bus.ppuInterrupt:
         # print(hex(cpu.pc)) # TEMP
         # this needs to be nested
@@ -91,16 +120,71 @@ while True:
             # print("NMI enable")
             cpu.interrupt(0xFFFA)
         bus.ppuInterrupt = False
+    
+    idleHead = None # ppu did something, a loop has to go around once more before it counts
+    limit = ppu.nextEvent() // 3 + 1 # first cpu cycle where the ppu has something to do
+    while cpu.cycles < limit:
+        if (cpu.pc in breakpoints):
+            print(f"Breakpoint {hex(cpu.pc)} hit! A {hex(cpu.a)} X {hex(cpu.x)} Y {hex(cpu.y)} SR {hex(cpu.sr)} SP {hex(cpu.sp)}")
+            stepping = True
+        if stepping:
+            t = input()
+            print(f"A {hex(cpu.a)} X {hex(cpu.x)} Y {hex(cpu.y)} SR {hex(cpu.sr)} SP {hex(cpu.sp)}")
+            if len(t) > 0:
+                stepping = False
+        
+        if cpu.testmode:
+            # slow and steady wins the race it seems
+            with open("testoutput.txt", "a") as file:
+                file.write(f"{cpu.pc:04X} {cpu.a:02X} {cpu.x:02X} {cpu.y:02X} {cpu.sp:02X} {cpu.sr:08b}\n")
         
-    if cpu.testmode:
-        # slow and steady wins the race it seems
-        with open("testoutput.txt", "a") as file:
-            file.write(f"{cpu.pc:04X} {cpu.a:02X} {cpu.x:02X} {cpu.y:02X} {cpu.sp:02X} {cpu.sr:08b}\n")
+        pcOld = cpu.pc
+        # blocks skip fetch, so the trace (loglevel 5) and the per instruction test log need it
+        if useBlocks and not (stepping or breakpoints or cpu.testmode or cpu.loglevel >= 5):
+            cpu.runBlock(limit)
+        else:
+            cpu.fetch()
         
-    cpu.fetch()
+        # idle loop skip, only counts when the loop's own jump/branch went back to its head
+        # (fetch ran exactly that instruction, or the block from the head covers the whole loop),
+        # some other jump landing on the head says nothing about the loop spinning
+        iterated = False
+        if idleSkip and (0 <= pcOld - cpu.pc < 0x20) and (cpu.cycles < limit) and not cpu.testmode:
+            loopCycles, loopEnd = cpu.idleLoop(cpu.pc)
+            if loopCycles and (pcOld == loopEnd or (pcOld == cpu.pc and cpu.blockEnd(cpu.pc) == loopEnd)):
+                iterated = True
+                if idleHead != cpu.pc:
+                    idleHead = cpu.pc
+                    idleEnd = loopEnd
+                else:
+                    # skip whole iterations, the one that reaches the next ppu event still runs normally
+                    skip = ((limit - 1 - cpu.cycles) // loopCycles) * loopCycles
+                    if skip > 0:
+                        cpu.cycles += skip
+                        idleSkipped += skip # never reaches the next ppu event, so its still this frame
+        # anything outside the loop ran, it has to go around once more before it counts
+        if not iterated and idleHead is not None and not (idleHead <= pcOld <= idleEnd and idleHead <= cpu.pc <= idleEnd):
+            idleHead = None
     
     # ppu is 3x faster than cpu
-    for i in range((cpu.cycles - cpuCyclesOld) * 3):
-        ppu.fetch()
-    cpuCyclesOld = cpu.cycles
-    
\ No newline at end of file
+    ppu.runUntil(cpu.cycles * 3)
+    
+    # new frame started, wait for real time to catch up
+    if ppu.cycles // 89342 != pacer.frames:
+        if args.idle_stats:
+            print(f"frame {pacer.frames}: skipped {idleSkipped} idle cpu cycles")
+        idleSkipped = 0
+        pacer.wait()
+        if rewinder is not None:
+            if pad.rewindHeld() and rewinder.rewind():
+                pacer.frames = ppu.cycles // 89342
+            else:
+                rewinder.capture()
+                if args.rewind_stats and pacer.frames % 60 == 0:
+                    print(f"rewind: {rewinder.seconds():.1f}s in {rewinder.size / 1024:.0f} kb, {rewinder.captureTime / rewinder.captures * 1000:.3f} ms per capture")
+        if args.save_state and args.save_every and pacer.frames % args.save_every == 0:
+            writeState()
+
+print(f"Ran {ppu.cycles // 89342 - startFrame} frames in {time.perf_counter() - startTime:.2f}s")
+if args.save_state:
+    writeState()
@@ -0,0 +1,177 @@
+import struct
+
+# cartridge mappers, they switch banks by pointing the bus page tables at slices of the rom
+# nothing gets copied on a bank switch, the views for every bank are made once up front
+
+# save state layout: magic, version, mapper register count, then one byte per register (see registerNames)
+mapperState = struct.Struct("<4sBB")
+
+# mapper 0, no bank switching at all
+class dmnrom:
+    registerNames = [] # everything a save state needs, updateBanks rebuilds the rest from these
+    
+    def __init__(self, bus, prg, chr, mirroring):
+        self.bus = bus
+        self.prg = prg
+        self.chrRam = len(chr) == 0
+        if self.chrRam:
+            chr = memoryview(bus.ppumem)[0:0x2000] # no chr banks means chr ram
+        self.chr = chr
+        self.__prgViews = {}
+        self.__chrViews = {}
+        
+        bus.setMirroring(mirroring)
+        self.prgBanks = max(1, len(prg) // 0x4000) # 16kb
+        self.chrBanks = max(1, len(chr) // 0x1000) # 4kb
+        
+        # writes to rom go to the mapper registers, the default is to ignore them
+        bus.mapDevice(0x8000, 0xFFFF, None, [self.write])
+        self.updateBanks()
+    
+    def updateBanks(self):
+        self.mapPrg16(0x8000, 0)
+        self.mapPrg16(0xC000, self.prgBanks - 1) # 16kb carts show up twice
+        self.mapChr4(0x0000, 0)
+        self.mapChr4(0x1000, 1)
+    
+    def write(self, value):
+        pass
+    
+    # save states
+    def snapshot(self):
+        registers = [getattr(self, name) for name in self.registerNames]
+        return mapperState.pack(b"dmMP", 1, len(registers)) + bytes(registers)
+    
+    def restore(self, data):
+        magic, version, count = mapperState.unpack_from(data)
+        if magic != b"dmMP" or version != 1 or count != len(self.registerNames):
+            raise Exception("Save state is not a state for this mapper from this version")
+        for i, name in enumerate(self.registerNames):
+            setattr(self, name, data[mapperState.size + i])
+        self.updateBanks()
+    
+    # switch in 16kb bank number bank at address (0x8000 or 0xC000)
+    def mapPrg16(self, address, bank):
+        bank %= self.prgBanks
+        if bank not in self.__prgViews:
+            start = bank * 0x4000
+            self.__prgViews[bank] = [self.prg[start + i * 0x100:start + (i + 1) * 0x100] for i in range(0x40)]
+        self.bus.mapPrg(address, self.__prgViews[bank])
+    
+    # switch in 4kb chr bank number bank at address (0x0000 or 0x1000)
+    def mapChr4(self, address, bank):
+        bank %= self.chrBanks
+        if bank not in self.__chrViews:
+            start = bank * 0x1000
+            self.__chrViews[bank] = [self.chr[start + i * 0x400:start + (i + 1) * 0x400] for i in range(4)]
+        self.bus.mapChr(address, self.__chrViews[bank])
+    
+    def mapChr8(self, bank):
+        self.mapChr4(0x0000, bank * 2)
+        self.mapChr4(0x1000, bank * 2 + 1)
+
+# mapper 1, games write the registers one bit at a time through a shift register
+class dmmmc1(dmnrom):
+    registerNames = ["control", "chrBank0", "chrBank1", "prgBank", "shift"]
+    
+    def __init__(self, bus, prg, chr, mirroring):
+        # registers (rom addresses 8000, A000, C000, E000)
+        self.control = 0x0C # prg mode 3 on power up, last bank fixed at C000
+        self.chrBank0 = 0
+        self.chrBank1 = 0
+        self.prgBank = 0
+        self.shift = 0x10 # the 1 falls out the bottom after 5 writes
+        
+        dmnrom.__init__(self, bus, prg, chr, mirroring)
+        
+        # which register the 5th write goes to depends on its address
+        bus.mapDevice(0x8000, 0x9FFF, None, [lambda value: self.__shiftIn(value, 0)])
+        bus.mapDevice(0xA000, 0xBFFF, None, [lambda value: self.__shiftIn(value, 1)])
+        bus.mapDevice(0xC000, 0xDFFF, None, [lambda value: self.__shiftIn(value, 2)])
+        bus.mapDevice(0xE000, 0xFFFF, None, [lambda value: self.__shiftIn(value, 3)])
+    
+    def __shiftIn(self, value, register):
+        if value & 0x80:
+            # reset, also goes back to prg mode 3
+            self.shift = 0x10
+            self.control |= 0x0C
+            self.updateBanks()
+            return
+        
+        done = self.shift & 1
+        self.shift = (self.shift >> 1) | ((value & 1) << 4)
+        if not done:
+            return
+        
+        value = self.shift
+        self.shift = 0x10
+        if register == 0:
+            self.control = value
+        elif register == 1:
+            self.chrBank0 = value
+        elif register == 2:
+            self.chrBank1 = value
+        else:
+            self.prgBank = value & 0x0F
+        self.updateBanks()
+    
+    # puts the banks the registers ask for in place, the bus skips anything already there
+    def updateBanks(self):
+        self.bus.setMirroring(["single0", "single1", "vertical", "horizontal"][self.control & 3])
+        
+        prgMode = (self.control >> 2) & 3
+        if prgMode < 2:
+            # 32kb, low bit ignored
+            self.mapPrg16(0x8000, self.prgBank & 0x0E)
+            self.mapPrg16(0xC000, (self.prgBank & 0x0E) + 1)
+        elif prgMode == 2:
+            self.mapPrg16(0x8000, 0)
+            self.mapPrg16(0xC000, self.prgBank)
+        else:
+            self.mapPrg16(0x8000, self.prgBank)
+            self.mapPrg16(0xC000, self.prgBanks - 1)
+        
+        if self.control & 0x10:
+            # 2 separate 4kb banks
+            self.mapChr4(0x0000, self.chrBank0)
+            self.mapChr4(0x1000, self.chrBank1)
+        else:
+            self.mapChr8(self.chrBank0 >> 1)
+
+# mapper 2, 16kb switchable at 8000 and the last bank fixed at C000
+class dmuxrom(dmnrom):
+    registerNames = ["bank"]
+    bank = 0
+    
+    def write(self, value):
+        self.bank = value
+        self.mapPrg16(0x8000, value)
+    
+    def updateBanks(self):
+        dmnrom.updateBanks(self)
+        self.mapPrg16(0x8000, self.bank)
+
+# mapper 3, only the 8kb chr bank switches
+class dmcnrom(dmnrom):
+    registerNames = ["bank"]
+    bank = 0
+    
+    def write(self, value):
+        self.bank = value
+        self.mapChr8(value)
+    
+    def updateBanks(self):
+        dmnrom.updateBanks(self)
+        self.mapChr8(self.bank)
+
+mappers = {
+    0: dmnrom,
+    1: dmmmc1,
+    2: dmuxrom,
+    3: dmcnrom
+}
+
+def makeMapper(number, bus, prg, chr, mirroring):
+    if number not in mappers:
+        raise Exception(f"Mapper {number} is not supported")
+    return mappers[number](bus, prg, chr, mirroring)
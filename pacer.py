@@ -0,0 +1,38 @@
+import time
+
+# keeps emulation at the speed of a real nes (or a multiple of it)
+# works off a running deadline instead of sleeping a fixed amount after each frame,
+# so time lost to a slow frame or an oversleep gets made up on the next ones
+class dmpacer:
+    # speed 1 is real time, 2 is double, 0 runs as fast as it can
+    # frameskip n only renders every n+1th frame, the rest are emulated but not drawn
+    def __init__(self, speed = 1, frameskip = 0, fps = 60.0988):
+        self.speed = speed
+        self.frameskip = frameskip
+        self.fps = fps # ntsc
+        
+        self.frames = 0
+        self.sleepTime = 0 # total seconds spent waiting
+        self.__deadline = None
+    
+    def shouldRender(self, frame):
+        return frame % (self.frameskip + 1) == 0
+    
+    # call once per emulated frame
+    def wait(self):
+        self.frames += 1
+        if self.speed <= 0:
+            return
+        
+        now = time.perf_counter()
+        if self.__deadline is None:
+            self.__deadline = now
+        self.__deadline += 1 / (self.fps * self.speed)
+        
+        delay = self.__deadline - now
+        if delay > 0:
+            time.sleep(delay)
+            self.sleepTime += delay
+        elif delay < -0.25:
+            # way behind (slow machine, breakpoint, window dragged), dont try to catch up all of it
+            self.__deadline = now
@@ -1,14 +1,63 @@
-import pygame
+import struct
+
+# save state layout: magic, version, buttons, shift position
+padState = struct.Struct("<4sBBB")
+
+# button names for input scripts, in controller bit order
+buttonNames = ["a", "b", "select", "start", "up", "down", "left", "right"]
+
+# input script, one "frame buttons" pair per line, buttons joined with + or - for none
+# the buttons stay held until the next line, e.g.
+#   120 start
+#   130 -
+#   200 right+a
+# a frame number on its own is the same as -
+def loadInputScript(filename):
+    script = []
+    with open(filename, "r") as file:
+        for number, line in enumerate(file, 1):
+            line = line.split("#")[0].split()
+            if len(line) == 0:
+                continue
+            if len(line) == 1:
+                line.append("-") # just a frame number, let go of everything
+            if len(line) > 2 or not line[0].isdigit():
+                raise Exception(f"{filename} line {number}: expected \"frame buttons\", got \"{' '.join(line)}\"")
+            state = 0
+            if line[1] != "-":
+                for name in line[1].split("+"):
+                    if name.lower() not in buttonNames:
+                        raise Exception(f"{filename} line {number}: unknown button \"{name}\", valid ones are {', '.join(buttonNames)} (or - for none)")
+                    state |= 1 << buttonNames.index(name.lower())
+            script.append((int(line[0]), state))
+    script.sort()
+    return script
+
 class dmjoypad:
-    def __init__(self, bus):
-        bus.readHooks.append(self.ram_read)
-        bus.writeHooks.append(self.ram_write)
+    # script is a list of (frame, state) from loadInputScript, None reads the keyboard
+    def __init__(self, bus, script = None):
+        bus.mapDevice(0x4016, 0x4017, [self.__readPad, self.__readPad2], [self.__writeStrobe, self.__writeNothing])
 
         self.state = 0
+        self.bit = 0
         self.shift_register = 0
         self.strobe = 0
+        
+        self.script = script
+        self.frame = lambda: 0 # current frame for scripts, main points this at the ppu
 
     def update_state(self):
+        if self.script is not None:
+            frame = self.frame()
+            state = 0
+            for start, buttons in self.script:
+                if start > frame:
+                    break
+                state = buttons
+            self.state = state
+            return
+        
+        import pygame # only needed with a window, headless runs may not have it
         pressed = pygame.key.get_pressed()
 
         state = 0
@@ -29,23 +78,40 @@ class dmjoypad:
         if pressed[pygame.K_RIGHT]:
             state |= 1 << 7
         self.state = state
+    
+    # rewind key, scripts and headless runs never hold it
+    def rewindHeld(self):
+        if self.script is not None:
+            return False
+        import pygame
+        return pygame.key.get_pressed()[pygame.K_BACKSPACE]
 
-    def ram_read(self, address):
-        if address == 0x4016:
-            self.update_state()
+    # save states
+    def snapshot(self):
+        return padState.pack(b"dmJP", 1, self.state, min(self.bit, 0xFF))
+    
+    def restore(self, data):
+        magic, version, self.state, self.bit = padState.unpack(data)
+        if magic != b"dmJP" or version != 1:
+            raise Exception("Save state is not a joypad state from this version")
+    
+    # $4016 register handlers
+    def __readPad(self):
+        self.update_state()
 
-            bit = (self.state >> self.bit) & 1
-            self.bit += 1
+        bit = (self.state >> self.bit) & 1
+        self.bit += 1
 
-            # https://github.com/jameskmurphy/nes
-            return (bit & 0b00011111) + (0x40 & 0b11100000)
-        if address == 0x4017:
-            return 0
+        # https://github.com/jameskmurphy/nes
+        return (bit & 0b00011111) + (0x40 & 0b11100000)
+    
+    def __writeStrobe(self, value):
+        if value & 1:
+            self.bit = 0
+    
+    # no second controller, $4017 reads as nothing and writes go to the apu (which we dont have)
+    def __readPad2(self):
+        return 0
     
-    def ram_write(self, address, value):
-         if address == 0x4016:
-            if value & 1:
-                self.bit = 0
-            return True
-         if address == 0x4017:
-            return True
\ No newline at end of file
+    def __writeNothing(self, value):
+        pass
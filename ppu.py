@@ -1,54 +1,75 @@
-import time
-from window import *
+import struct
+import numpy as np
 
-bgColors = [
-    (0, 0, 0),
-    (255, 0, 0),
-    (0, 255, 0),
-    (0, 0, 255)
-]
-
-spriteColors = [
-    [
-        None,
-        (255, 0, 0),
-        (200, 0, 0),
-        (150, 0, 0),
-    ],
-
-    [
-        None,
-        (0, 255, 0),
-        (0, 200, 0),
-        (0, 150, 0),
-    ],
+# save state layout: magic, version, ctrl, mask, status, oamaddr, scrollx, scrolly, scroll, addr, data,
+# intlAddr, secondWrite, cycles, then the scanline state (x origin, y origin, next line) and 256 bytes of oam
+ppuState = struct.Struct("<4sBBBBBBBBBBHBQHhB")
 
-    [
-        None,
-        (0, 0, 255),
-        (0, 0, 200),
-        (0, 0, 150),
-    ],
-
-    [
-        None,
-        (255, 255, 0),
-        (200, 200, 0),
-        (150, 150, 0),
-    ],
+# the 64 colors the ppu can put out, palette ram holds indexes into this
+masterPalette = [
+    (84, 84, 84), (0, 30, 116), (8, 16, 144), (48, 0, 136), (68, 0, 100), (92, 0, 48), (84, 4, 0), (60, 24, 0),
+    (32, 42, 0), (8, 58, 0), (0, 64, 0), (0, 60, 0), (0, 50, 60), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (152, 150, 152), (8, 76, 196), (48, 50, 236), (92, 30, 228), (136, 20, 176), (160, 20, 100), (152, 34, 32), (120, 60, 0),
+    (84, 90, 0), (40, 114, 0), (8, 124, 0), (0, 118, 40), (0, 102, 120), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (236, 238, 236), (76, 154, 236), (120, 124, 236), (176, 98, 236), (228, 84, 236), (236, 88, 180), (236, 106, 100), (212, 136, 32),
+    (160, 170, 0), (116, 196, 0), (76, 208, 32), (56, 204, 108), (56, 180, 204), (60, 60, 60), (0, 0, 0), (0, 0, 0),
+    (236, 238, 236), (168, 204, 236), (188, 188, 236), (212, 178, 236), (236, 174, 236), (236, 174, 212), (236, 180, 176), (228, 196, 144),
+    (204, 210, 120), (180, 222, 120), (168, 226, 144), (152, 226, 180), (160, 214, 228), (160, 162, 160), (0, 0, 0), (0, 0, 0),
 ]
 
+# which 2 bits of the attribute byte a tile uses, by position inside its 32x32 pixel area
+attributeShifts = ((np.arange(30)[:, np.newaxis] & 2) << 1) | (np.arange(32)[np.newaxis, :] & 2)
+
 class dmppu:
-    def __init__(self, rambus, loglevel = 3):
-        self.window = dmslopywindow()
+    # window can be anything with pixels/setPalette/present (see headless.py), default is a pygame window
+    def __init__(self, rambus, loglevel = 3, window = None):
+        if window is None:
+            from window import dmslopywindow # only pulls in pygame when there is a screen
+            window = dmslopywindow()
+        self.window = window
+        self.pacer = None # frame skipping, the actual waiting is done by main (see pacer.py)
         
         self.rambus = rambus
-        self.rambus.readHooks.append(self.ram_read)
-        self.rambus.writeHooks.append(self.ram_write)
+        # $2000-$2007, indexed by address & 7 and mirrored up to $3FFF by the bus
+        self.readRegisters = [
+            self.__readCtrl, self.__readMask, self.__readStatus, self.__readOamAddr,
+            self.__readOamData, self.__readScroll, self.__readAddr, self.__readData
+        ]
+        self.writeRegisters = [
+            self.__writeCtrl, self.__writeMask, self.__writeStatus, self.__writeOamAddr,
+            self.__writeOamData, self.__writeScroll, self.__writeAddr, self.__writeData
+        ]
+        self.rambus.mapDevice(0x2000, 0x3FFF, self.readRegisters, self.writeRegisters)
+        self.rambus.mapDevice(0x4014, 0x4014, None, [self.__writeOamDma])
         self.secondWrite = False
 
-        self.oam = [0] * 0x256
-        self.patternTable = []
+        self.oam = bytearray(0x100)
+        # decoded chr, one 8x8 color index array per tile, refreshed from the bus's chrDirty
+        # (flip, tile) with flip none/x/y/xy, tiles 0-255 are the left table and 256-511 the right
+        self.__tiles = np.zeros((4, 512, 8, 8), dtype=np.uint8)
+        self.patternTable = self.__tiles[0].reshape(2, 256, 8, 8) # (table, tile, 8, 8)
+        self.spritePatterns = self.__tiles.reshape(4, 2, 256, 8, 8).transpose(1, 0, 2, 3, 4) # (table, flip, tile, 8, 8)
+        self.tilesDecoded = 0
+        
+        # pre rendered background, all 4 logical nametables as a 2x2 screen color index bitmap
+        # only cells whose tile, attribute or chr changed since last frame get drawn again
+        self.bgLayer = np.zeros((480, 512), dtype=np.uint8)
+        self.__bgLayerNametables = None # nametable bytes the layer was drawn from
+        self.__bgLayerTable = None # pattern table the layer was drawn from
+        self.tilesRedrawn = 0 # last frame
+        self.tilesRedrawnTotal = 0
+        self.renderStats = False
+        
+        # scanline state, lines get drawn in batches as register writes come in
+        self.clock = lambda: self.cycles # current ppu cycle, main points this at the cpu since self.cycles lags behind
+        self.__frameStart = 0
+        self.__lineDrawn = 0 # next line to draw
+        self.__xOrigin = 0 # layer column at the left of the screen
+        self.__yOrigin = 0 # layer row at line 0
+        self.__pixels = self.window.pixels # palette ram indexes of this frame, drawn straight into the window
+        self.__spriteLines = np.zeros(240, dtype=bool)
+        self.__rendering = True # false on frames the pacer skips
+        self.__cachesStale = False # set by restore, the layer and tiles get rebuilt before the next draw
         
         # init state
         self.rambus.cpumem[0x2000] = 0 # ctrl
@@ -59,7 +80,6 @@ class dmppu:
         self.rambus.cpumem[0x2005] = 0 # scroll (internal 2 byte)
         
         self.cycles = 0
-        self.lastFrame = time.time()
         
         # read from PPU memory?
         # 2 byte internal register for addr
@@ -79,6 +99,7 @@ class dmppu:
         self.oamdata = self.rambus.cpumem[0x2004] # done
         self.scrollx = self.rambus.cpumem[0x2005] # done
         self.scrolly = self.rambus.cpumem[0x2005] # done
+        self.scroll = self.rambus.cpumem[0x2005] # last $2005 write
         self.addr = self.rambus.cpumem[0x2006] # done
         self.data = self.rambus.cpumem[0x2007] # done
         self.oamdma = self.rambus.cpumem[0x4014] # done
@@ -153,234 +174,336 @@ class dmppu:
             else:
                 self.status &= ~mask             
     
-    def ram_read(self, address):
-        if address == 0x2000:
-            return self.ctrl
-        if address == 0x2001:
-            return self.mask
-        if address == 0x2002:
-            status = self.status
-
-            # reset vblank on read
-            self.statusFlagSet('v', False)
+    # register handlers, the bus calls these straight from its page table
+    # reads
+    def __readCtrl(self):
+        return self.ctrl
+    
+    def __readMask(self):
+        return self.mask
+    
+    def __readStatus(self):
+        status = self.status
 
-            #read resets write pair for $2005/$2006
-            self.secondWrite = False
+        # reset vblank on read
+        self.statusFlagSet('v', False)
 
-            return status
-        if address == 0x2003:
-            return self.oamaddr
-        if address == 0x2004:
-            return self.oam[self.oamaddr]
-        if address == 0x2005:
-            return self.scroll
-        if address == 0x2006:
-            return self.addr
-        if address == 0x2007:
-            # print(f"vram read {hex(self.intlAddr)}")
+        #read resets write pair for $2005/$2006
+        self.secondWrite = False
 
-            # directly read from vram for palette data
-            if (self.intlAddr >= 0x3F00) and (self.intlAddr <= 0x3FFF):
-                return_value = self.rambus.memoryReadPPU(self.intlAddr)
-                # buffer the data "underneath"
-                self.data = self.rambus.memoryReadPPU(self.intlAddr - 0x1000)
-            else:
-                return_value = self.data
-                self.data = self.rambus.memoryReadPPU(self.intlAddr)
-            self.intlAddr += (int(self.ctrlFlagGet('i')) * 31 + 1)
-            return return_value
+        return status
+    
+    def __readOamAddr(self):
+        return self.oamaddr
+    
+    def __readOamData(self):
+        return self.oam[self.oamaddr]
+    
+    def __readScroll(self):
+        # write only on hardware, give back the last write like $2006 does
+        return self.scroll
+    
+    def __readAddr(self):
+        return self.addr
+    
+    def __readData(self):
+        # print(f"vram read {hex(self.intlAddr)}")
 
-    def ram_write(self, address, value):
-        if address == 0x2000:
-            self.ctrl = value
-            return True
-        if address == 0x2001:
-            self.mask = value
-            return True
-        if address == 0x2002:
-            self.status = value
-            return True
-        if address == 0x2003:
-            self.oamaddr = value
-            return True
-        if address == 0x2004:
-            # print("oam write")
-            self.oam[self.oamaddr] = value
-            self.oamaddr = (self.oamaddr + 1) & 0xFF
-            return True
-        if address == 0x2005:
-            if self.secondWrite:
-                self.scrolly = value
-            else:
-                self.scrollx = value
-            self.secondWrite = not self.secondWrite
-            return True
-        if address == 0x2006:
-            self.addr = value
+        # directly read from vram for palette data
+        if (self.intlAddr >= 0x3F00) and (self.intlAddr <= 0x3FFF):
+            return_value = self.rambus.memoryReadPPU(self.intlAddr)
+            # buffer the data "underneath"
+            self.data = self.rambus.memoryReadPPU(self.intlAddr - 0x1000)
+        else:
+            return_value = self.data
+            self.data = self.rambus.memoryReadPPU(self.intlAddr)
+        self.intlAddr += (int(self.ctrlFlagGet('i')) * 31 + 1)
+        return return_value
+    
+    # writes
+    def __writeCtrl(self, value):
+        self.drawLines(self.currentLine() + 1)
+        self.ctrl = value
+        self.__xOrigin = ((value & 1) << 8) | (self.__xOrigin & 0xFF)
+    
+    def __writeMask(self, value):
+        self.drawLines(self.currentLine() + 1)
+        self.mask = value
+    
+    def __writeStatus(self, value):
+        self.status = value
+    
+    def __writeOamAddr(self, value):
+        self.oamaddr = value
+    
+    def __writeOamData(self, value):
+        # print("oam write")
+        self.oam[self.oamaddr] = value
+        self.oamaddr = (self.oamaddr + 1) & 0xFF
+    
+    def __writeScroll(self, value):
+        self.drawLines(self.currentLine() + 1)
+        self.scroll = value
+        if self.secondWrite:
+            self.scrolly = value # y only gets picked up at the start of the next frame
+        else:
+            self.scrollx = value
+            self.__xOrigin = (self.__xOrigin & 0x100) | value
+        self.secondWrite = not self.secondWrite
+    
+    def __writeAddr(self, value):
+        line = self.currentLine()
+        self.drawLines(line + 1)
+        self.addr = value
 
-            if self.secondWrite:
-                self.intlAddr = (self.intlAddr & 0xFF00) + value
-            else:
-                self.intlAddr = (self.intlAddr & 0x00FF) + (value << 8)
-                
-            self.secondWrite = not self.secondWrite
-            return True
-        if address == 0x2007:
-            self.rambus.memoryWritePPU(self.intlAddr, value)
-            self.intlAddr += (int(self.ctrlFlagGet('i')) * 31 + 1)
-            return True
-        if address == 0x4014:
-            # TODO: 513-514 cycle delay
+        if self.secondWrite:
+            self.intlAddr = (self.intlAddr & 0xFF00) + value
+            
+            # the address and the scroll are the same register on the real ppu,
+            # so setting it mid frame moves the picture (zelda style splits)
+            if line < 240:
+                nametable = (self.intlAddr >> 10) & 3
+                self.__xOrigin = ((nametable & 1) << 8) | ((self.intlAddr & 31) << 3) | (self.__xOrigin & 7)
+                row = (nametable >> 1) * 240 + ((self.intlAddr >> 5) & 31) * 8 + ((self.intlAddr >> 12) & 7)
+                self.__yOrigin = row - (line + 1) # next line shows that row
+        else:
+            self.intlAddr = (self.intlAddr & 0x00FF) + (value << 8)
+            
+        self.secondWrite = not self.secondWrite
+    
+    def __writeData(self, value):
+        self.rambus.memoryWritePPU(self.intlAddr, value)
+        self.intlAddr += (int(self.ctrlFlagGet('i')) * 31 + 1)
+    
+    def __writeOamDma(self, value):
+        # the whole page in one copy, straight out of the bus page table (ram, prg ram or rom)
+        source = self.rambus.readPages[value]
+        if source is None:
             page = value * 0x100
-            self.oam[0x00:0xFF] = self.rambus.memoryReadCPU(page, page + 0xFF)
-            # print(f"oam dma {hex(page)}")
-            return True
+            # io page, nobody does this. reads the registers a byte at a time like the real dma would
+            source = bytes(self.rambus.memoryReadCPU(page + i) for i in range(0x100))
+        
+        # dma fills oam starting at oamaddr and wraps around
+        split = 0x100 - self.oamaddr
+        self.oam[self.oamaddr:0x100] = source[0:split]
+        self.oam[0:self.oamaddr] = source[split:0x100]
+        
+        # the cpu is stalled while the dma runs
+        if self.rambus.dmaStall is not None:
+            self.rambus.dmaStall()
+    
+    # save states
+    def snapshot(self):
+        return ppuState.pack(b"dmPP", 1, self.ctrl, self.mask, self.status, self.oamaddr,
+                             self.scrollx, self.scrolly, self.scroll, self.addr, self.data,
+                             self.intlAddr & 0xFFFF, self.secondWrite, self.cycles,
+                             self.__xOrigin, self.__yOrigin, self.__lineDrawn) + bytes(self.oam)
+    
+    def restore(self, data):
+        (magic, version, self.ctrl, self.mask, self.status, self.oamaddr,
+         self.scrollx, self.scrolly, self.scroll, self.addr, self.data,
+         self.intlAddr, secondWrite, self.cycles,
+         self.__xOrigin, self.__yOrigin, self.__lineDrawn) = ppuState.unpack_from(data)
+        if magic != b"dmPP" or version != 1:
+            raise Exception("Save state is not a ppu state from this version")
+        self.secondWrite = bool(secondWrite)
+        self.oam[:] = data[ppuState.size:ppuState.size + 0x100]
+        self.__frameStart = self.cycles - (self.cycles % 89342)
+        
+        # beginFrame already ran for this frame before the state was taken, so the caches are from
+        # whatever was running before. the bus may not be restored yet, so rebuild them on the next draw
+        self.__rendering = self.pacer is None or self.pacer.shouldRender(self.cycles // 89342)
+        self.__cachesStale = True
     
     # frame render logic
+    # the background gets drawn a batch of scanlines at a time while the frame runs (see drawLines),
+    # this finishes it off at vblank and puts it on screen
     def renderFrame(self):
-        for event in pygame.event.get():
-            # print(event)
-            pass
+        self.window.handleEvents()
         
-        self.window.framebuffer.fill(0x400000) # blood red for the blood sweat and tears going into ts
-
         # RENDER YOUR GAME HERE
-        self.renderBackground()
+        self.drawLines(240)
         self.renderSprites()
+        self.window.setPalette(self.paletteLut())
+        self.window.present()
+        if self.renderStats:
+            print(f"frame {self.cycles // 89342}: redrew {self.tilesRedrawn} background tiles, presenting took {self.window.presentTime * 1000:.2f} ms")
+    
+    # palette ram as a list of rgb, indexed the same way as the pixels (0-15 background, 16-31 sprites)
+    def paletteLut(self):
+        palette = [entry & 0x3F for entry in self.rambus.ppumem[0x3F00:0x3F20]]
+        palette[4:16:4] = [palette[0]] * 3 # color 0 of every background palette is the backdrop
+        return [masterPalette[entry] for entry in palette]
+    
+    # top of the frame, bring the background layer up to date and latch the scroll
+    def beginFrame(self):
+        # skipped frames still get emulated, they just dont draw anything
+        self.__rendering = self.pacer is None or self.pacer.shouldRender(self.cycles // 89342)
+        if self.__rendering:
+            self.updateBackground(self.updatePatternTable())
+            self.__cachesStale = False
+        self.__frameStart = self.cycles
+        self.__lineDrawn = 0
+        self.__xOrigin = ((self.ctrl & 1) << 8) | self.scrollx
+        self.__yOrigin = ((self.ctrl >> 1) & 1) * 240 + self.scrolly
+    
+    # scanline the ppu is on right now, 341 ppu cycles each
+    def currentLine(self):
+        return (self.clock() - self.__frameStart) // 341
+    
+    # draw scanlines up to (not including) end with the registers as they are now
+    # register writes call this first, so every run of lines with the same scroll/ctrl/mask is one batch
+    def drawLines(self, end):
+        if self.__cachesStale and self.__rendering:
+            self.updateBackground(self.updatePatternTable())
+            self.__cachesStale = False
+        end = min(end, 240)
+        if end <= self.__lineDrawn or not self.__rendering:
+            return
+        lines = np.arange(self.__lineDrawn, end)
+        self.__lineDrawn = end
         
-        scaled = pygame.transform.scale(
-            self.window.framebuffer, self.window.screen.get_size()
-        )
-
-        self.window.screen.blit(scaled, (0, 0))
-        
-        # flip() the display to put your work on screen
-        pygame.display.flip()
-        self.lastFrame = time.time() # this line HAS to be last
+        if self.maskFlagGet('b'):
+            if int(self.ctrlFlagGet('b')) != self.__bgLayerTable:
+                self.updateBackground(np.empty(0, dtype=np.intp)) # pattern table switched mid frame
+            
+            # crop out of the layer at the scroll position, wrapping around
+            rows = (lines + self.__yOrigin) % 480
+            cols = (np.arange(256) + self.__xOrigin) % 512
+            self.__pixels[lines] = self.bgLayer[rows[:, np.newaxis], cols[np.newaxis, :]]
+        else:
+            self.__pixels[lines] = 0 # background off, just the backdrop
+        self.__spriteLines[lines] = self.maskFlagGet('s')
         
+    # marks every tile dirty and decodes now, for when chr got loaded behind the bus's back
     def buildPatternTable(self):
-        address = 0
-        patternTable = []
-
-        for i in range(2): # iterate through both pattern tables
-            tiles = []
-            for j in range(256): # iterate through all tiles in table
-                tile = []
-                for k in range(8): # 8*2 byte pairs per tile
-                    lobyte = self.rambus.memoryReadPPU(address)
-                    hibyte = self.rambus.memoryReadPPU(address + 8)
-                    address += 1
+        self.rambus.chrDirty[:] = b"\x01" * 512
+        self.updatePatternTable()
+    
+    # decode only the tiles the bus saw a write to since last time, returns their indexes
+    def updatePatternTable(self):
+        dirty = np.flatnonzero(np.frombuffer(self.rambus.chrDirty, dtype=np.uint8))
+        if len(dirty) == 0:
+            return dirty
+        self.rambus.chrDirty[:] = bytes(512)
+        
+        # each tile is 8 lobytes then 8 hibytes
+        chr = np.frombuffer(b"".join(self.rambus.chrPages), dtype=np.uint8).reshape(512, 2, 8)[dirty]
+        
+        # unpackbits takes the msb first, same as the pixels are laid out
+        planes = np.unpackbits(chr[..., np.newaxis], axis=-1) # (n, 2, 8, 8)
+        tiles = planes[:, 0] | (planes[:, 1] << 1)
+        
+        # sprites get all 4 flips ready to go, indexed by the top 2 attribute bits
+        self.__tiles[0, dirty] = tiles
+        self.__tiles[1, dirty] = tiles[..., ::-1]
+        self.__tiles[2, dirty] = tiles[..., ::-1, :]
+        self.__tiles[3, dirty] = tiles[..., ::-1, ::-1]
+        self.tilesDecoded += len(dirty)
+        return dirty
 
-                    row = []
-                    for x in range(8): # for each pixel in the row
-                        # decrement, take msb first
-                        bit0 = (lobyte >> (7 - x)) & 1
-                        bit1 = (hibyte >> (7 - x)) & 1
-                        color_index = (bit1 << 1) | bit0
-                        #print(color_index)
-                        row.append(color_index)
-                    tile.append(row)
-                address += 8 # already parsed the other 8 hibytes, skip
-                tiles.append(tile)
+    # redraw the cells of the background layer that changed since last time
+    def updateBackground(self, changedTiles):
+        table = int(self.ctrlFlagGet('b'))
+        pattern = self.patternTable[table]
+        
+        # all 4 logical nametables (mirroring included), 960 tile bytes + 64 attribute bytes each
+        nametables = np.empty((4, 0x400), dtype=np.uint8)
+        for i in range(4):
+            data, addr = self.rambus.getMemAddyPPU(0x2000 + i * 0x400)
+            nametables[i] = np.frombuffer(data, dtype=np.uint8, count=0x400, offset=addr)
+        tileBytes = nametables[:, 0:960].reshape(4, 30, 32)
+        
+        # find the 8x8 cells that need drawing again
+        if table != self.__bgLayerTable:
+            dirty = np.ones((4, 30, 32), dtype=bool) # other pattern table, everything changes
+            self.__bgLayerTable = table
+        else:
+            changed = nametables != self.__bgLayerNametables
+            dirty = changed[:, 0:960].reshape(4, 30, 32)
             
-            patternTable.append(tiles)
-        self.patternTable = patternTable
-
-    def renderBackground(self):
-        # put these here for performance (dont loop this 30*32 times)
-        base_nt = self.ctrl & 0b11
-        pattern = self.patternTable[int(self.ctrlFlagGet('b'))]
+            # an attribute byte covers 4x4 tiles
+            attributes = changed[:, 960:1024].reshape(4, 8, 8)
+            if attributes.any():
+                dirty |= np.repeat(np.repeat(attributes, 4, axis=1), 4, axis=2)[:, 0:30, :]
+            
+            # chr changed under some tiles, only counts for this pattern table
+            changedTiles = changedTiles[(changedTiles >> 8) == table] & 0xFF
+            if len(changedTiles):
+                dirty |= np.isin(tileBytes, changedTiles)
+        self.__bgLayerNametables = nametables
         
-        for y in range(30):
-            for x in range(32):
-                
-                # apply scroll vars to renderer
-                fixed_x = x * 8 + self.scrollx
-                fixed_y = y * 8 + self.scrolly
-                
-                # find nametable to render
-                nt_x = (fixed_x // 256) & 1
-                nt_y = (fixed_y // 240) & 1
-                
-                nametable = base_nt ^ (nt_x | (nt_y << 1))
-                base = 0x2000 + nametable * 0x400
-                
-                # fix tile coords
-                tile_x = (fixed_x // 8) & 31
-                tile_y = (fixed_y // 8) % 30
-                
-                # old logic
-                # tile index from nametable
-                address = base + tile_y * 32 + tile_x # base + y offset + x offset (like a 2d array access)
-                tile_index = self.rambus.memoryReadPPU(address)
-                
-                # select pattern table
-                tile = pattern[tile_index]
-                
-                # iterate per pixel for drawing
-                # 8*8 pixel tiles
-                screen_y = y * 8
-                for row in tile:
-                    screen_x = x * 8
-                    
-                    for pixel in row:
-                        # check if pixel is inside the screen
-                        if 0 <= screen_x < 256 and 0 <= screen_y < 240:
-                            color = bgColors[pixel] # faster to hardcode 4 colors than indexing attribute table
-                            
-                            self.window.framebuffer.set_at((screen_x, screen_y), color)
-                        screen_x += 1
-                        
-                    screen_y += 1
-
-                     
-    def renderSprites(self):
-        pattern_table = self.patternTable[int(self.ctrlFlagGet('s'))]
-
-        # oam fits 64 sprites (256 bytes / 4 bytes per sprite)
-        for i in range(64):
-            base = i * 4
-
-            # sprite object
-            # back in MY DAY we did OOP manually in assembly
-            sprite_y = self.oam[base + 0]
-            tile_index = self.oam[base + 1]
-            attr = self.oam[base + 2]
-            sprite_x = self.oam[base + 3]
-            palette_id = attr & 0b00000011
-            flip_x = bool(attr & 0b01000000) # bit six
-            flip_y = bool(attr & 0b10000000) # bit SEVENNNNNNN
-
-            # sprite to render
-            tile = pattern_table[tile_index]
+        # draw them into the 2x2 screen layer, nametable i sits at screen (i & 1, i >> 1)
+        nt, row, col = np.nonzero(dirty)
+        if len(nt):
+            # attribute bytes spread out to one palette number per tile, (4, 30, 32)
+            attributes = nametables[:, 960:1024].reshape(4, 8, 8)
+            palettes = (np.repeat(np.repeat(attributes, 4, axis=1), 4, axis=2)[:, 0:30, :] >> attributeShifts) & 3
             
-            # reverse order if flip
-            if (flip_y):
-                tile = tile[::-1]
-
-            screen_y = sprite_y
-            for row in tile:
-                screen_x = sprite_x
-                
-                # reverse order if flip
-                if (flip_x):
-                    row = row[::-1]
+            # layer pixels are palette ram indexes 0-15 (palette * 4 + color)
+            layer = self.bgLayer.reshape(60, 8, 64, 8) # (tile row, pixel row, tile col, pixel col)
+            layer[(nt >> 1) * 30 + row, :, (nt & 1) * 32 + col, :] = pattern[tileBytes[nt, row, col]] | (palettes[nt, row, col] << 2)[:, np.newaxis, np.newaxis]
+        self.tilesRedrawn = len(nt)
+        self.tilesRedrawnTotal += len(nt)
 
-                for pixel in row:
-                    if pixel != 0:
-                        color = spriteColors[palette_id][pixel]
-                        self.window.framebuffer.set_at((screen_x, screen_y), color)
-                    screen_x += 1
-
-                screen_y += 1
+    def renderSprites(self):
+        # decode all of oam in one go, a row per sprite: y, tile, attr, x
+        sprites = np.frombuffer(self.oam, dtype=np.uint8).reshape(64, 4)
+        
+        # y 0xEF-0xFF parks a sprite below the screen, games do this to hide them
+        sprites = sprites[sprites[:, 0] < 0xEF]
+        if len(sprites) == 0:
+            return
+        
+        sprite_y = sprites[:, 0].astype(np.intp)
+        sprite_x = sprites[:, 3].astype(np.intp)
+        attr = sprites[:, 2]
+        
+        # flip bits (6 and 7) pick the pre flipped copy of the tile
+        tiles = self.spritePatterns[int(self.ctrlFlagGet('s')), attr >> 6, sprites[:, 1]] # (n, 8, 8)
+        colors = tiles | (((attr & 0b00000011) << 2) | 0x10)[:, np.newaxis, np.newaxis] # palette ram indexes 16-31
+        
+        # screen position of every sprite pixel
+        offsets = np.arange(8)
+        screen_y = np.broadcast_to(sprite_y[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis], tiles.shape)
+        screen_x = np.broadcast_to(sprite_x[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :], tiles.shape)
+        opaque = (tiles != 0) & (screen_y < 240) & (screen_x < 256)
+        opaque &= self.__spriteLines[np.minimum(screen_y, 239)] # lines drawn with sprites off
+        
+        # pixels come out in oam order, so the first one on each spot is the lowest index (the one on top)
+        position, first = np.unique((screen_y * 256 + screen_x)[opaque], return_index=True)
+        self.__pixels.reshape(-1)[position] = colors[opaque][first]
 
                                         
+    # ppu cycle of the next thing fetch actually does (frame render at 0, vblank at 82181)
+    # anything in between is just counting, so runUntil skips straight over it
+    def nextEvent(self):
+        cycle = self.cycles % 89342
+        if cycle == 0:
+            return self.cycles
+        if cycle <= 82181:
+            return self.cycles + (82181 - cycle)
+        return self.cycles + (89342 - cycle)
+    
+    # runs every event in [cycles, target) then jumps to target
+    def runUntil(self, target):
+        event = self.nextEvent()
+        while event < target:
+            self.cycles = event
+            self.fetch()
+            event = self.nextEvent()
+        self.cycles = target
+    
     def fetch(self):
         # frame timing stuff
         cycle = self.cycles % 89342
         
         # handling vblank with NMI
         if (cycle) == 82181:
+            if self.__rendering:
+                self.renderFrame()
+            else:
+                self.window.handleEvents()
             self.statusFlagSet('v', True)
             # self.ctrlFlagSet('v', True)
             self.rambus.ppuInterrupt = True
@@ -388,14 +511,7 @@ class dmppu:
             # self.statusFlagSet('v', False)
             
             # rendering new frames
-            delta = time.time() - self.lastFrame
-            # dont sleep if fps is less than 60 LOL
-            try:
-                time.sleep(0.0167 - delta)
-            except:
-                pass
-            self.renderFrame()
-            # print(f"frame rendered {1/delta} fps")
+            self.beginFrame()
             # print(self.oam)
         
         self.cycles += 1
\ No newline at end of file
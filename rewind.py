@@ -0,0 +1,90 @@
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+
+from savestate import *
+
+# rewind buffer, a save state for every frame of the last few seconds
+# storing them whole would be ~23kb a frame, but ram and nametables barely change from one frame
+# to the next, so every keyframeEvery frames a full state is kept and the ones in between are
+# xored against it, which leaves mostly zeros that zlib squashes down to a few hundred bytes
+class dmrewind:
+    def __init__(self, parts, seconds = 10, maxMB = 16, keyframeEvery = 60, fps = 60):
+        self.parts = parts
+        self.maxFrames = int(seconds * fps)
+        self.maxBytes = int(maxMB * 1024 * 1024)
+        # groups get evicted whole, keep them small next to the window so it doesnt jump around
+        self.keyframeEvery = min(keyframeEvery, max(1, self.maxFrames // 4))
+
+        self.states = deque() # (is keyframe, compressed blob), oldest first
+        self.size = 0 # compressed bytes in states
+        self.__groups = deque() # [states, compressed bytes] per keyframe group (keyframe and its deltas), oldest first
+        self.__keyframe = None # uncompressed newest keyframe as uint8 array, what deltas are against
+
+        self.captures = 0
+        self.captureTime = 0 # seconds spent in capture, for stats
+
+    # call once per frame
+    def capture(self):
+        start = time.perf_counter()
+        state = np.frombuffer(saveState(self.parts), dtype=np.uint8)
+
+        # new keyframe every keyframeEvery frames, or early once the group is a quarter of the memory cap
+        # (lots changing on screen), so evicting one never takes a big bite out of the buffer either
+        if (self.__keyframe is None or self.__groups[-1][0] >= self.keyframeEvery or self.__groups[-1][1] * 4 > self.maxBytes
+                or len(state) != len(self.__keyframe)):
+            self.__keyframe = state
+            self.__groups.append([0, 0])
+            entry = (True, zlib.compress(state, 1))
+        else:
+            entry = (False, zlib.compress(state ^ self.__keyframe, 1))
+        self.states.append(entry)
+        self.size += len(entry[1])
+        self.__groups[-1][0] += 1
+        self.__groups[-1][1] += len(entry[1])
+
+        # deltas are useless without their keyframe, so the oldest one goes together with its deltas
+        # only once the whole group is older than the window, so theres always at least maxFrames to go back
+        # the newest group stays no matter what, its keyframe is what the next captures need
+        while len(self.__groups) > 1:
+            if len(self.states) - self.__groups[0][0] >= self.maxFrames or self.size > self.maxBytes:
+                self.__dropOldest()
+            else:
+                break
+
+        self.captures += 1
+        self.captureTime += time.perf_counter() - start
+
+    def __dropOldest(self):
+        count, size = self.__groups.popleft()
+        for i in range(count):
+            self.states.popleft()
+        self.size -= size
+
+    # takes the newest state off the buffer and loads it, returns False when theres nothing left
+    def rewind(self):
+        if len(self.states) == 0:
+            return False
+
+        isKeyframe, blob = self.states.pop()
+        self.size -= len(blob)
+        state = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+        if not isKeyframe:
+            state = state ^ self.__keyframe
+        loadState(self.parts, state)
+
+        self.__groups[-1][0] -= 1
+        self.__groups[-1][1] -= len(blob)
+        if isKeyframe:
+            # back in the previous keyframe's deltas, find it again
+            self.__groups.pop()
+            self.__keyframe = None
+            if len(self.__groups):
+                isKeyframe, blob = self.states[len(self.states) - self.__groups[-1][0]]
+                self.__keyframe = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+        return True
+
+    def seconds(self, fps = 60):
+        return len(self.states) / fps
@@ -0,0 +1,72 @@
+import mmap
+import struct
+
+# 16 byte ines header: magic, prg size, chr size, flags 6-10, padding
+headerStruct = struct.Struct("<4sBBBBBBBB4s")
+
+# header fields, works for ines 1.0 and nes 2.0
+class dmromheader:
+    def __init__(self, data):
+        if len(data) < 16:
+            raise FileNotFoundError("The file is not an iNES file")
+        magic, prgRom, chrRom, ctrl1, ctrl2, byte8, byte9, byte10, byte11, padding = headerStruct.unpack(bytes(data[0:16]))
+        if magic != b"NES\x1a":
+            raise FileNotFoundError("The file is not an iNES file")
+        
+        self.isNes2 = (ctrl2 & 0x0C) == 0x08
+        self.hasTrainer = bool((ctrl1 >> 2) & 1) # 512 bytes before prg
+        self.hasBattery = bool((ctrl1 >> 1) & 1)
+        self.isVertical = bool(ctrl1 & 1) # if false then game mirrors horizontal
+        self.is4Screen = bool((ctrl1 >> 3) & 1)
+        
+        if self.is4Screen:
+            self.mirroring = "four"
+        else:
+            self.mirroring = "vertical" if self.isVertical else "horizontal"
+        
+        if self.isNes2:
+            self.mapper = (ctrl1 >> 4) | (ctrl2 & 0xF0) | ((byte8 & 0x0F) << 8)
+            self.submapper = byte8 >> 4
+            self.prgSize = self.__nes2Size(prgRom, byte9 & 0x0F, 0x4000)
+            self.chrSize = self.__nes2Size(chrRom, byte9 >> 4, 0x2000)
+        else:
+            # old dumpers wrote their name over bytes 7-15 ("DiskDude!"), the top mapper nibble is junk then
+            if padding != b"\x00\x00\x00\x00":
+                ctrl2 = 0
+            self.mapper = (ctrl1 >> 4) | (ctrl2 & 0xF0)
+            self.submapper = 0
+            self.prgSize = prgRom * 0x4000
+            self.chrSize = chrRom * 0x2000
+        
+        self.prgStart = 16 + (self.hasTrainer * 512)
+        self.chrStart = self.prgStart + self.prgSize
+        self.size = self.chrStart + self.chrSize # bytes the file needs at least
+    
+    # nes 2.0 sizes have 4 more bits in byte 9, 0xF there means exponent * multiplier instead
+    def __nes2Size(self, low, high, unit):
+        if high == 0x0F:
+            return (1 << (low >> 2)) * ((low & 3) * 2 + 1)
+        return ((high << 8) | low) * unit
+
+# only reads the 16 header bytes, for going through a whole folder of roms
+def readHeader(filename):
+    with open(filename, "rb") as file:
+        return dmromheader(file.read(16))
+
+# rom file mapped into memory read only, prg/chr/trainer are memoryviews into it (no copies)
+class dmrom:
+    def __init__(self, filename):
+        with open(filename, "rb") as file:
+            try:
+                self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise FileNotFoundError("The file is not an iNES file") # empty file
+        self.data = memoryview(self.__map)
+        
+        self.header = dmromheader(self.data)
+        if len(self.data) < self.header.size:
+            raise FileNotFoundError(f"The file is truncated, the header needs {self.header.size} bytes but it has {len(self.data)}")
+        
+        self.trainer = self.data[16:self.header.prgStart]
+        self.prg = self.data[self.header.prgStart:self.header.chrStart]
+        self.chr = self.data[self.header.chrStart:self.header.size] # empty means chr ram
@@ -0,0 +1,27 @@
+import struct
+
+# a full save state is the snapshot() of every part glued together, each with its length in front
+# parts have to be passed in the same order for saving and loading (main uses cpu, ppu, bus, pad, mapper)
+stateHeader = struct.Struct("<4sBB") # magic, version, number of parts
+partHeader = struct.Struct("<I")
+
+def saveState(parts):
+    data = bytearray(stateHeader.pack(b"SLOP", 1, len(parts)))
+    for part in parts:
+        blob = part.snapshot()
+        data += partHeader.pack(len(blob))
+        data += blob
+    return bytes(data)
+
+def loadState(parts, data):
+    data = memoryview(data)
+    magic, version, count = stateHeader.unpack_from(data)
+    if magic != b"SLOP" or version != 1 or count != len(parts):
+        raise Exception("Not a save state from this version")
+    
+    offset = stateHeader.size
+    for part in parts:
+        size, = partHeader.unpack_from(data, offset)
+        offset += partHeader.size
+        part.restore(data[offset:offset + size])
+        offset += size
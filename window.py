@@ -1,8 +1,72 @@
+import time
 import pygame
+import numpy as np
 class dmslopywindow():
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((640, 600), pygame.RESIZABLE)
         pygame.display.set_caption("slopylator main")
         
-        self.framebuffer = pygame.Surface((256, 240))
\ No newline at end of file
+        # the ppu draws palette indexes straight into this, one byte per pixel (rows of 256)
+        self.pixels = np.zeros((240, 256), dtype=np.uint8)
+        
+        # 8 bit surface, the palette turns the indexes into colors when it gets drawn
+        self.framebuffer = pygame.Surface((256, 240), depth=8)
+        self.__palette = None
+        
+        # scaled copy of the framebuffer, only rebuilt when the window size or scale mode changes
+        self.integerScale = False # whole multiples only (2x, 3x...), letterboxed and cheaper
+        self.__target = None
+        self.__targetPos = (0, 0)
+        self.__buildTarget()
+        
+        # seconds spent putting frames on screen, separate from emulating them
+        self.presentTime = 0 # last frame
+        self.presentTimeTotal = 0
+    
+    def setScaleMode(self, integerScale):
+        self.integerScale = integerScale
+        self.__buildTarget()
+    
+    def __buildTarget(self):
+        width, height = self.screen.get_size()
+        if self.integerScale:
+            scale = max(1, min(width // 256, height // 240))
+            size = (256 * scale, 240 * scale)
+        else:
+            size = (width, height)
+        self.__targetPos = ((width - size[0]) // 2, (height - size[1]) // 2)
+        self.__target = pygame.Surface(size, depth=8)
+        if self.__palette is not None:
+            self.__target.set_palette(self.__palette)
+        self.screen.fill((0, 0, 0)) # clear the letterbox bars
+    
+    # colors is a list of (r, g, b), only touches the surfaces when it actually changed
+    def setPalette(self, colors):
+        if colors != self.__palette:
+            self.__palette = colors
+            self.framebuffer.set_palette(colors)
+            self.__target.set_palette(colors)
+    
+    def handleEvents(self):
+        for event in pygame.event.get():
+            # print(event)
+            if event.type == pygame.VIDEORESIZE:
+                self.__buildTarget()
+    
+    def present(self):
+        start = time.perf_counter()
+        
+        # surfarray wants x first
+        pygame.surfarray.blit_array(self.framebuffer, self.pixels.T)
+        
+        # scale into the cached surface instead of making a new one every frame
+        pygame.transform.scale(self.framebuffer, self.__target.get_size(), self.__target)
+
+        self.screen.blit(self.__target, self.__targetPos)
+        
+        # flip() the display to put your work on screen
+        pygame.display.flip()
+        
+        self.presentTime = time.perf_counter() - start
+        self.presentTimeTotal += self.presentTime